@@ -1,10 +1,43 @@
-from .newrag import rag_chat, DataCollector, RAGSystem
+import importlib
 
 __version__ = "1.0.0"
 __author__ = "OrbitAI Team"
 
-__all__ = [
-    "rag_chat",
-    "DataCollector", 
-    "RAGSystem"
-]
+# Exports are imported on first access, so light modules such as feed_cache can be
+# used (e.g. by the standalone briefing) without loading Chroma, sklearn and the rest
+_EXPORTS = {
+    "rag_chat": ".newrag",
+    "arag_chat": ".newrag",
+    "ingest": ".newrag",
+    "aingest": ".newrag",
+    "DataCollector": ".newrag",
+    "RAGSystem": ".newrag",
+    "DocumentIndex": ".index",
+    "IndexRetriever": ".index",
+    "document_id": ".index",
+    "NumpyVectorStore": ".numpy_store",
+    "RAGService": ".service",
+    "get_service": ".service",
+    "set_service": ".service",
+    "FeedCache": ".feed_cache",
+    "get_feed_cache": ".feed_cache",
+    "FeedTier": ".feed_tier",
+    "SemanticAnswerCache": ".answer_cache",
+    "StreamingIngest": ".stream_ingest",
+    "IndexSync": ".sync",
+    "LocalEmbeddings": ".embedding_backends",
+    "get_embeddings": ".embedding_backends",
+    "register_embedding_backend": ".embedding_backends",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,103 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("RAG_ANSWER_CACHE_MAX_ENTRIES", "512"))
+# Answers about "today" go out of date even when the index does not change
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("RAG_ANSWER_CACHE_TTL_SECONDS", "900"))
+
+class SemanticAnswerCache:
+    """In-memory answer cache keyed on query embeddings.
+
+    A query is a hit when its embedding has cosine similarity of at least
+    ``threshold`` with a cached query made under the same ``key`` (the
+    query's parsed filters, so "today" and "tomorrow" never share an
+    answer however close their embeddings are). All entries are dropped as soon as the
+    index version they were answered against changes; beyond that, entries
+    expire after ``ttl`` seconds and the least recently used ones are evicted
+    past ``max_entries``.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def get(self, vector, version, key=None):
+        """Return the cached entry under ``key`` closest to ``vector`` above the threshold, or None"""
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_version(version)
+            self._expire()
+            best_key, best_score = None, self.threshold
+            for entry_key, entry in self._entries.items():
+                if entry["key"] != key:
+                    continue
+                score = float(np.dot(entry["vector"], query))
+                if score >= best_score:
+                    best_key, best_score = entry_key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key]
+
+    def put(self, vector, version, answer, sources=None, key=None):
+        with self._lock:
+            self._check_version(version)
+            self._entries[self._next_key] = {
+                "key": key,
+                "vector": self._normalize(vector),
+                "answer": answer,
+                "sources": sources,
+                "created_at": time.time()
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+            "invalidations": self.invalidations,
+            "index_version": self._version
+        }
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        # Insertion order is creation order, but hits move entries to the end
+        expired = [key for key, entry in self._entries.items() if entry["created_at"] < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
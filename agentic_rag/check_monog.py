@@ -1,60 +1,92 @@
 import os
-import requests
+import sys
 import json
+import hashlib
+from itertools import islice
 from datetime import datetime
 from dotenv import load_dotenv
 from pymongo import MongoClient
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import Chroma
+from langchain_openai import ChatOpenAI
 from langchain.schema import Document
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+if __package__ in (None, ""):
+    # Started as a script (python check_monog.py): import through the package so the relative imports resolve
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "agentic_rag"
+from .embedding_cache import CachedEmbeddings
+from .embedding_backends import get_embeddings, DEFAULT_OPENAI_EMBEDDING_MODEL
+from .context_packing import ContextPacker
+from .feed_cache import get_feed_cache
+from .feed_tier import FeedTier
+from .index import DocumentIndex, IndexRetriever
+from .query_filters import date_key
+from .stream_ingest import iter_records, iter_batches, INGEST_BATCH_SIZE
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MONGODB_URL = os.getenv("MONGODB_URL")
-WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast?latitude=12.9165&longitude=79.1325&current=temperature_2m,wind_speed_10m,relative_humidity_2m&hourly=temperature_2m,precipitation"
-NEWS_API_URL = "https://saurav.tech/NewsAPI/top-headlines/category/general/in.json"
+# Chroma's default collection name, which this script has always written to
+COLLECTION_NAME = "langchain"
 
 class DataCollector:
     def __init__(self):
         self.mongo_client = MongoClient(MONGODB_URL)
         self.db = self.mongo_client["OrbitAI"]
     
-    def get_emails_and_calendar(self):
-        """Enhanced extraction with proper calendar parsing"""
+    def get_emails_and_calendar(self, limit=None):
+        """Enhanced extraction with proper calendar parsing: every record, or only the first ``limit`` as a sample"""
         documents = []
         
         try:
-            collection = self.db["OrbitAI"]
-            
-            for record in collection.find().limit(50):
-                for key, value in record.items():
-                    if key == '_id' or key == 'id':
-                        continue
-                    
-                    # Enhanced calendar parsing - THIS IS THE KEY PART
-                    if key.startswith('calendar:'):
-                        calendar_doc = self._parse_calendar_event(key)
-                        if calendar_doc:
-                            documents.append(calendar_doc)
-                    else:
-                        # Regular content extraction for emails and other data
-                        content = self._extract_content_from_field(key, value)
-                        if content:
-                            doc_type = self._determine_content_type(key, content)
-                            documents.append(Document(
-                                page_content=content,
-                                metadata={"type": doc_type, "source": "mongodb", "field": key[:50]}
-                            ))
+            for record in islice(iter_records(self.db["OrbitAI"]), limit):
+                documents.extend(self._record_to_documents(record))
                             
         except Exception as e:
             print(f"MongoDB error: {e}")
             
         return documents
     
-    def _parse_calendar_event(self, calendar_key):
+    def iter_document_batches(self, batch_size=INGEST_BATCH_SIZE):
+        """Documents of the whole collection, one cursor batch of records at a time"""
+        records = iter_records(self.db["OrbitAI"], batch_size=batch_size)
+        for batch in iter_batches(records, batch_size):
+            yield [doc for record in batch for doc in self._record_to_documents(record)]
+    
+    def _record_to_documents(self, record):
+        documents = []
+        for key, value in record.items():
+            if key == '_id' or key == 'id':
+                continue
+            
+            # Enhanced calendar parsing - THIS IS THE KEY PART
+            if key.startswith('calendar:'):
+                calendar_doc = self._parse_calendar_event(key, self._source_key(record['_id'], key))
+                if calendar_doc:
+                    documents.append(calendar_doc)
+            else:
+                # Regular content extraction for emails and other data
+                content = self._extract_content_from_field(key, value)
+                if content:
+                    doc_type = self._determine_content_type(key, content)
+                    documents.append(Document(
+                        page_content=content,
+                        metadata={
+                            "type": doc_type,
+                            "source": "mongodb",
+                            "field": key[:50],
+                            "source_key": self._source_key(record['_id'], key)
+                        }
+                    ))
+        return documents
+    
+    def _source_key(self, record_id, key):
+        """Same per-field identity newrag uses, so a changed field replaces its old version"""
+        key_hash = hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:16]
+        return f"mongodb:{record_id}:{key_hash}"
+    
+    def _parse_calendar_event(self, calendar_key, source_key=None):
         """Parse calendar event from the key string"""
         try:
             # Remove 'calendar:' prefix and split by newlines
@@ -94,11 +126,13 @@ Duration: {self._calculate_duration(start_datetime, end_datetime)}"""
                 metadata={
                     "type": "calendar",
                     "source": "mongodb",
+                    "source_key": source_key,
                     "event_name": event_name,
                     "start_time": start_time,
                     "end_time": end_time,
                     "start_hour": start_datetime.hour if start_datetime else None,
-                    "date": start_datetime.date().isoformat() if start_datetime else None
+                    "date": start_datetime.date().isoformat() if start_datetime else None,
+                    "date_key": date_key(start_datetime.date()) if start_datetime else None
                 }
             )
             
@@ -189,8 +223,7 @@ Duration: {self._calculate_duration(start_datetime, end_datetime)}"""
     def get_weather_data(self):
         """Fetch current weather data"""
         try:
-            response = requests.get(WEATHER_API_URL)
-            data = response.json()
+            data = get_feed_cache().get("weather")
             
             current = data.get('current', {})
             weather_content = f"""Current Weather:
@@ -201,7 +234,7 @@ Time: {current.get('time', 'N/A')}"""
             
             return [Document(
                 page_content=weather_content,
-                metadata={"type": "weather", "source": "api"}
+                metadata={"type": "weather", "source": "api", "source_key": "api:weather"}
             )]
         except Exception as e:
             print(f"Weather API error: {e}")
@@ -210,18 +243,17 @@ Time: {current.get('time', 'N/A')}"""
     def get_news_data(self):
         """Fetch latest news"""
         try:
-            response = requests.get(NEWS_API_URL)
-            data = response.json()
+            data = get_feed_cache().get("news")
             
             documents = []
-            for article in data.get('articles', [])[:3]:
+            for rank, article in enumerate(data.get('articles', [])[:3]):
                 news_content = f"""News: {article.get('title', 'No title')}
 Description: {article.get('description', 'No description')}
 Source: {article.get('source', {}).get('name', 'Unknown')}"""
                 
                 documents.append(Document(
                     page_content=news_content,
-                    metadata={"type": "news", "source": "api"}
+                    metadata={"type": "news", "source": "api", "source_key": f"api:news:{rank}"}
                 ))
                 
             return documents
@@ -230,20 +262,50 @@ Source: {article.get('source', {}).get('name', 'Unknown')}"""
             return []
 
 class RAGSystem:
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
+    def __init__(self, feed_sources=None):
+        self.embeddings = CachedEmbeddings(get_embeddings())
         self.llm = ChatOpenAI(api_key=OPENAI_API_KEY, temperature=0.1)
+        self.index = None
         self.vectorstore = None
+        # Weather/news are searched in memory next to the persisted mail and calendar documents
+        self.feed_tier = FeedTier(self.embeddings.embeddings, feed_sources) if feed_sources else None
+    
+    def load_index(self):
+        if self.index is None:
+            collection_name = COLLECTION_NAME
+            if self.embeddings.model != DEFAULT_OPENAI_EMBEDDING_MODEL:
+                collection_name = f"{COLLECTION_NAME}-{self.embeddings.model.replace(':', '-')}"
+            self.index = DocumentIndex(self.embeddings, persist_directory="./chroma_db", collection_name=collection_name)
+            self.vectorstore = self.index.vectorstore
+        return self.index
     
     def create_vectorstore(self, documents):
+        self.load_index()
         if not documents:
-            print("No documents to create vectorstore")
+            print("No documents to add to the vectorstore")
             return
-        self.vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            persist_directory="./chroma_db"
-        )
+        # Content-hash ids make re-running the script a no-op instead of another copy of every document
+        stats = self.index.upsert(documents)
+        stats["expired"] = self.index.expire()
+        print(f"Index updated: {stats['added']} added, {stats['removed']} removed, {stats['unchanged']} unchanged, {stats['expired']} expired")
+        print(f"Embedding cache: {self.embeddings.stats()}")
+    
+    def ingest(self, document_batches):
+        """Upsert documents batch by batch, so the whole collection never sits in memory; returns totals"""
+        index = self.load_index()
+        totals = {"documents": 0, "added": 0, "removed": 0, "unchanged": 0}
+        with index.deferred_writes():
+            for documents in document_batches:
+                if not documents:
+                    continue
+                stats = index.upsert(documents)
+                totals["documents"] += len(documents)
+                for key in ("added", "removed", "unchanged"):
+                    totals[key] += stats[key]
+            totals["expired"] = index.expire()
+        print(f"Index updated: {totals['added']} added, {totals['removed']} removed, {totals['unchanged']} unchanged, {totals['expired']} expired")
+        print(f"Embedding cache: {self.embeddings.stats()}")
+        return totals
         
     def setup_qa_chain(self):
         template = """You are a personal assistant with access to the user's emails, calendar events, weather, and news data.
@@ -271,7 +333,13 @@ Answer:"""
         return RetrievalQA.from_chain_type(
             llm=self.llm,
             chain_type="stuff",
-            retriever=self.vectorstore.as_retriever(search_kwargs={"k": 15}),
+            # Filters on type/date/start_hour parsed from the question, relaxed if too few match
+            retriever=IndexRetriever(
+                index=self.index,
+                k=15,
+                feed_tier=self.feed_tier,
+                packer=ContextPacker(model=self.llm.model_name)
+            ),
             chain_type_kwargs={"prompt": prompt}
         )
 
@@ -280,31 +348,24 @@ def main():
     print("=" * 60)
     
     collector = DataCollector()
+    rag = RAGSystem(feed_sources={"weather": collector.get_weather_data, "news": collector.get_news_data})
     
-    print(" Collecting all data...")
-    email_cal_docs = collector.get_emails_and_calendar()
-    weather_docs = collector.get_weather_data()
-    news_docs = collector.get_news_data()
-    
-    all_documents = email_cal_docs + weather_docs + news_docs
-    print(f" Total documents collected: {len(all_documents)}")
+    print(" Indexing the whole MongoDB collection...")
+    totals = rag.ingest(collector.iter_document_batches())
+    print(f" Documents extracted: {totals['documents']}")
     
     # Show calendar events specifically
-    calendar_docs = [doc for doc in all_documents if doc.metadata.get('type') == 'calendar']
-    print(f" Calendar events found: {len(calendar_docs)}")
+    calendar_events = list(rag.index.metadata_where({"type": "calendar"}).values())
+    print(f" Calendar events indexed: {len(calendar_events)}")
     
-    for i, doc in enumerate(calendar_docs):
-        event_name = doc.metadata.get('event_name', 'Unknown Event')
+    for i, metadata in enumerate(calendar_events[:20]):
+        event_name = metadata.get('event_name', 'Unknown Event')
         print(f"   {i+1}. {event_name}")
     
-    if not all_documents:
+    if rag.index.count() == 0:
         print(" No documents found.")
         return
     
-    rag = RAGSystem()
-    print("\n Creating vector database...")
-    rag.create_vectorstore(all_documents)
-    
     print("⚡ Setting up QA chain...")
     qa_chain = rag.setup_qa_chain()
     
@@ -0,0 +1,26 @@
+import sys
+import argparse
+from .index import DocumentIndex, RETENTION, parse_retention
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Remove expired, duplicate and superseded vectors from the RAG index")
+    arg_parser.add_argument("--retention", default=RETENTION, help='Per-type retention, e.g. "weather=3h,news=1d"')
+    arg_parser.add_argument("--vacuum", action="store_true", help="Also give freed space back to the filesystem (stop the server first)")
+    arg_parser.add_argument("--collection", help="Collection to compact (default: the one RAGSystem uses)")
+    arg_parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    args = arg_parser.parse_args(argv)
+
+    from .newrag import RAGSystem
+    rag = RAGSystem()
+    index = DocumentIndex(rag.embeddings, collection_name=args.collection) if args.collection else rag.load_index()
+    retention = parse_retention(args.retention)
+    if args.dry_run:
+        print(
+            f"{len(index.expired_ids(retention))} expired and {len(index.redundant_ids())} duplicate/superseded "
+            f"of {index.count()} documents would be removed"
+        )
+        return
+    index.compact(retention, vacuum=args.vacuum)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
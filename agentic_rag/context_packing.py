@@ -0,0 +1,114 @@
+import os
+import re
+import tiktoken
+from langchain.schema import Document
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+# No single document may take more than this, so one long email cannot crowd out the rest
+CONTEXT_MAX_DOC_TOKENS = int(os.getenv("RAG_CONTEXT_MAX_DOC_TOKENS", "800"))
+# A truncated tail shorter than this is not worth its tokens and is dropped instead
+CONTEXT_MIN_DOC_TOKENS = int(os.getenv("RAG_CONTEXT_MIN_DOC_TOKENS", "40"))
+# Share of a document's shingles already present in a higher-ranked one that marks it a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("RAG_NEAR_DUPLICATE_THRESHOLD", "0.8"))
+SEPARATOR = "\n\n"
+
+_WORD = re.compile(r"\w+")
+_WORD_WITH_SPACE = re.compile(r"\S+\s*|\s+")
+
+class WordEncoding:
+    """Stand-in for a tiktoken encoding when its BPE file cannot be loaded (e.g. offline): one token per word"""
+
+    def encode(self, text):
+        return _WORD_WITH_SPACE.findall(text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+def shingles(text, size=3):
+    """Set of word n-grams; short texts fall back to their words"""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+class ContextPacker:
+    """Turns ranked retrieval results into a prompt context of bounded size.
+
+    Documents are taken in relevance order. One whose shingles mostly appear
+    in an already kept document is skipped as a near-duplicate (this also
+    catches fragments of a longer record). Each document is capped at
+    ``max_doc_tokens`` and the last one that does not fit the ``budget`` is
+    truncated to the remaining tokens; everything ranked below it is dropped.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, max_doc_tokens=CONTEXT_MAX_DOC_TOKENS,
+                 min_doc_tokens=CONTEXT_MIN_DOC_TOKENS, duplicate_threshold=NEAR_DUPLICATE_THRESHOLD,
+                 model="gpt-3.5-turbo", encoding=None):
+        self.budget = budget
+        self.max_doc_tokens = max_doc_tokens
+        self.min_doc_tokens = min_doc_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.model = model
+        self._encoding = encoding
+        self.last_stats = {}
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            try:
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"tiktoken encoding unavailable ({e}), counting words instead")
+                self._encoding = WordEncoding()
+        return self._encoding
+
+    def count_tokens(self, text):
+        return len(self.encoding.encode(text))
+
+    def pack(self, documents):
+        """Return the documents to put in the prompt, in their original order"""
+        separator_tokens = self.count_tokens(SEPARATOR)
+        kept, kept_shingles = [], []
+        used = 0
+        stats = {"candidates": len(documents), "duplicates": 0, "truncated": 0, "dropped": 0}
+
+        for position, doc in enumerate(documents):
+            doc_shingles = shingles(doc.page_content)
+            if self._is_duplicate(doc_shingles, kept_shingles):
+                stats["duplicates"] += 1
+                continue
+
+            tokens = self.encoding.encode(doc.page_content)
+            available = self.budget - used - (separator_tokens if kept else 0)
+            limit = min(self.max_doc_tokens, available)
+            if len(tokens) > limit:
+                if limit < self.min_doc_tokens:
+                    stats["dropped"] += len(documents) - position
+                    break
+                tokens = tokens[:limit]
+                doc = Document(page_content=self.encoding.decode(tokens), metadata=doc.metadata)
+                stats["truncated"] += 1
+
+            used += len(tokens) + (separator_tokens if kept else 0)
+            kept.append(doc)
+            kept_shingles.append(doc_shingles)
+
+        stats.update({"documents": len(kept), "tokens": used, "budget": self.budget})
+        self.last_stats = stats
+        print(
+            f"Context packed: {stats['documents']}/{stats['candidates']} documents, "
+            f"{stats['tokens']}/{self.budget} tokens ({stats['duplicates']} near-duplicates, "
+            f"{stats['truncated']} truncated, {stats['dropped']} dropped)"
+        )
+        return kept
+
+    def _is_duplicate(self, doc_shingles, kept_shingles):
+        if not doc_shingles:
+            return False
+        for other in kept_shingles:
+            if len(doc_shingles & other) / len(doc_shingles) >= self.duplicate_threshold:
+                return True
+        return False
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# "openai" (remote, default) or "local" (CPU-only, no network); see EMBEDDING_BACKENDS
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "openai")
+DEFAULT_OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+OPENAI_EMBEDDING_MODEL = os.getenv("RAG_OPENAI_EMBEDDING_MODEL", DEFAULT_OPENAI_EMBEDDING_MODEL)
+# Shortened output size; only the text-embedding-3 models accept it
+OPENAI_EMBEDDING_DIMENSIONS = int(os.getenv("RAG_EMBEDDING_DIMENSIONS", "0")) or None
+SHORTENABLE_MODEL_PREFIX = "text-embedding-3"
+LOCAL_EMBEDDING_DIMENSIONS = int(os.getenv("RAG_LOCAL_EMBEDDING_DIMENSIONS", "384"))
+LOCAL_EMBEDDING_FEATURES = int(os.getenv("RAG_LOCAL_EMBEDDING_FEATURES", str(2 ** 18)))
+LOCAL_EMBEDDING_SEED = 42
+# Output components each hashed feature is spread over (with random signs)
+LOCAL_EMBEDDING_FEATURE_SPREAD = 8
+
+class LocalEmbeddings(Embeddings):
+    """Deterministic, offline embeddings: hashed word and bigram counts, randomly projected.
+
+    Texts are turned into sublinear term counts with a HashingVectorizer and
+    projected to ``dimensions`` with a fixed-seed sparse random projection
+    (every hashed feature adds +-1 to a few output components), then
+    L2-normalised. Nothing is fitted on the corpus, so every process
+    produces the same vector for the same text and a whole batch is embedded
+    with two sparse matrix operations.
+    """
+
+    model = "local-hashing"
+
+    def __init__(self, dimensions=LOCAL_EMBEDDING_DIMENSIONS, n_features=LOCAL_EMBEDDING_FEATURES, seed=LOCAL_EMBEDDING_SEED):
+        self.dimensions = dimensions
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            # Keep one-character tokens: "9" in "9 am" matters for calendar questions
+            token_pattern=r"(?u)\b\w+\b",
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32
+        )
+        # Sparse random projection built directly: each feature gets FEATURE_SPREAD random +-1 entries
+        rng = np.random.default_rng(seed)
+        spread = min(LOCAL_EMBEDDING_FEATURE_SPREAD, dimensions)
+        self.projection = sparse.csr_matrix(
+            (
+                rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=n_features * spread) / np.sqrt(spread),
+                (np.repeat(np.arange(n_features), spread), rng.integers(0, dimensions, size=n_features * spread))
+            ),
+            shape=(n_features, dimensions),
+            dtype=np.float32
+        )
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        counts = self.vectorizer.transform(texts)
+        counts.data = np.log1p(counts.data)
+        vectors = np.asarray((counts @ self.projection).todense(), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def supports_dimensions(model):
+    """Whether ``model`` can shorten its output, i.e. whether truncated vectors stay meaningful"""
+    return str(model or "").startswith(SHORTENABLE_MODEL_PREFIX)
+
+def _openai_embeddings(http_client=None, http_async_client=None):
+    # Fail when the service starts, not on the first embedding request
+    if OPENAI_EMBEDDING_DIMENSIONS and not supports_dimensions(OPENAI_EMBEDDING_MODEL):
+        raise ValueError(
+            f"RAG_EMBEDDING_DIMENSIONS={OPENAI_EMBEDDING_DIMENSIONS} needs a {SHORTENABLE_MODEL_PREFIX} model; "
+            f"{OPENAI_EMBEDDING_MODEL} does not accept it"
+        )
+    return OpenAIEmbeddings(
+        model=OPENAI_EMBEDDING_MODEL,
+        dimensions=OPENAI_EMBEDDING_DIMENSIONS,
+        api_key=OPENAI_API_KEY,
+        http_client=http_client,
+        http_async_client=http_async_client
+    )
+
+def _local_embeddings(http_client=None, http_async_client=None):
+    return LocalEmbeddings()
+
+EMBEDDING_BACKENDS = {
+    "openai": _openai_embeddings,
+    "local": _local_embeddings,
+}
+
+def register_embedding_backend(name, factory):
+    """Add a backend; ``factory`` takes the optional shared httpx clients and returns an Embeddings"""
+    EMBEDDING_BACKENDS[name] = factory
+
+def get_embeddings(backend=None, http_client=None, http_async_client=None):
+    """Build the (uncached) embedding backend named by ``backend`` or RAG_EMBEDDING_BACKEND"""
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {sorted(EMBEDDING_BACKENDS)}")
+    return EMBEDDING_BACKENDS[backend](http_client=http_client, http_async_client=http_async_client)
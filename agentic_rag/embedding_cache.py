@@ -0,0 +1,155 @@
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from array import array
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = os.getenv("RAG_EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("RAG_EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+SQLITE_BATCH_SIZE = 500
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def embedding_model_name(embeddings):
+    """Cache namespace for an embedding backend: model name plus output size"""
+    model = getattr(embeddings, "model", None) or type(embeddings).__name__
+    dimensions = getattr(embeddings, "dimensions", None)
+    return f"{model}:{dimensions}" if dimensions else model
+
+class CachedEmbeddings(Embeddings):
+    """On-disk, content-addressed cache in front of another embedding backend.
+
+    Vectors are keyed by (model, sha256(text)) in SQLite. Only cache misses
+    are sent upstream, in a single batched call, and the least recently used
+    entries are evicted once the cache grows past ``max_entries``. The async
+    methods do their SQLite work in a worker thread, off the event loop.
+    """
+
+    def __init__(self, embeddings, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES, model=None):
+        self.embeddings = embeddings
+        self.model = model or embedding_model_name(embeddings)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        # Kept up to date on every store, so writes do not have to count the table
+        self._entries = self._count()
+
+    def embed_documents(self, texts):
+        vectors, missing = self._lookup(texts)
+        if missing:
+            fresh = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            self._store(fresh.items())
+            vectors.update(fresh)
+        return [vectors[text_hash(text)] for text in texts]
+
+    def embed_query(self, text):
+        vectors, missing = self._lookup([text])
+        if missing:
+            vector = self.embeddings.embed_query(text)
+            self._store([(text_hash(text), vector)])
+            return vector
+        return vectors[text_hash(text)]
+
+    async def aembed_documents(self, texts):
+        vectors, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            fresh = dict(zip(missing, await self.embeddings.aembed_documents(list(missing.values()))))
+            await asyncio.to_thread(self._store, list(fresh.items()))
+            vectors.update(fresh)
+        return [vectors[text_hash(text)] for text in texts]
+
+    async def aembed_query(self, text):
+        vectors, missing = await asyncio.to_thread(self._lookup, [text])
+        if missing:
+            vector = await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self._store, [(text_hash(text), vector)])
+            return vector
+        return vectors[text_hash(text)]
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current cache size"""
+        with self._lock:
+            entries = self._count()
+        total = self.hits + self.misses
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": entries
+        }
+
+    def _lookup(self, texts):
+        """Return cached vectors by hash and the {hash: text} of every miss"""
+        hashes = {}
+        for text in texts:
+            hashes.setdefault(text_hash(text), text)
+        vectors = self._lookup_hashes(list(hashes))
+        missing = {h: text for h, text in hashes.items() if h not in vectors}
+        self.hits += len(hashes) - len(missing)
+        self.misses += len(missing)
+        return vectors, missing
+
+    def _lookup_hashes(self, hashes):
+        vectors = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(hashes), SQLITE_BATCH_SIZE):
+                batch = hashes[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model, *batch]
+                ).fetchall()
+                for h, blob in rows:
+                    vectors[h] = array("f", blob).tolist()
+                self._conn.execute(
+                    f"UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash IN ({placeholders})",
+                    [now, self.model, *batch]
+                )
+            self._conn.commit()
+        return vectors
+
+    def _store(self, items):
+        now = time.time()
+        rows = [(self.model, h, array("f", vector).tobytes(), now) for h, vector in items]
+        with self._lock:
+            # Same model and text always give the same vector, so an existing row can stay
+            self._entries += self._conn.executemany("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)", rows).rowcount
+            self._evict()
+            self._conn.commit()
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries"""
+        if self._entries <= self.max_entries:
+            return
+        # Other processes may share the file, so recount before deleting
+        self._entries = self._count()
+        excess = self._entries - self.max_entries
+        if excess > 0:
+            self._entries -= self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            ).rowcount
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import threading
+import requests
+from pathlib import Path
+
+WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast?latitude=12.9165&longitude=79.1325&current=temperature_2m,wind_speed_10m,relative_humidity_2m&hourly=temperature_2m,precipitation"
+NEWS_API_URL = "https://saurav.tech/NewsAPI/top-headlines/category/general/in.json"
+FEED_TIMEOUT_SECONDS = float(os.getenv("RAG_FEED_TIMEOUT_SECONDS", "5"))
+# Directory for the optional on-disk copy of each feed; unset keeps the cache in memory only
+FEED_CACHE_DIR = os.getenv("FEED_CACHE_DIR")
+# How long past its TTL a cached payload may still be served while it is refreshed
+FEED_MAX_STALE_SECONDS = float(os.getenv("FEED_MAX_STALE_SECONDS", "86400"))
+
+FEEDS = {
+    "weather": {"url": WEATHER_API_URL, "ttl": float(os.getenv("FEED_WEATHER_TTL_SECONDS", "900"))},
+    "news": {"url": NEWS_API_URL, "ttl": float(os.getenv("FEED_NEWS_TTL_SECONDS", "3600"))},
+}
+
+class FeedCache:
+    """TTL cache for external JSON feeds shared by the RAG pipeline and the briefing tools.
+
+    A fresh entry is returned directly. An expired one is still returned while
+    a single background thread refetches it (stale-while-revalidate); only a
+    missing or very old entry makes the caller wait on the API. With
+    ``cache_dir`` set, payloads are also written to disk so other processes and
+    restarts start warm.
+    """
+
+    def __init__(self, feeds=FEEDS, cache_dir=FEED_CACHE_DIR, max_stale=FEED_MAX_STALE_SECONDS, timeout=FEED_TIMEOUT_SECONDS):
+        self.feeds = feeds
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._fetch_locks = {name: threading.Lock() for name in feeds}
+        self._refreshing = set()
+        self._disk_mtimes = {}
+
+    def get(self, name):
+        """Return the JSON payload of a feed, fetching it only when nothing usable is cached"""
+        entry = self._entry(name)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age < self.feeds[name]["ttl"]:
+                return entry["data"]
+            if age < self.feeds[name]["ttl"] + self.max_stale:
+                self._refresh_in_background(name)
+                return entry["data"]
+        try:
+            return self.refresh(name)
+        except Exception:
+            if entry is not None:
+                return entry["data"]
+            raise
+
+    def refresh(self, name):
+        """Fetch a feed now and store it; concurrent callers share one request"""
+        lock = self._fetch_locks[name]
+        with lock:
+            entry = self._entry(name)
+            # Another thread may have refreshed it while we waited for the lock
+            if entry is not None and time.time() - entry["fetched_at"] < self.feeds[name]["ttl"]:
+                return entry["data"]
+            response = requests.get(self.feeds[name]["url"], timeout=self.timeout)
+            response.raise_for_status()
+            entry = {"fetched_at": time.time(), "data": response.json()}
+            with self._lock:
+                self._entries[name] = entry
+            self._write_to_disk(name, entry)
+            return entry["data"]
+
+    def fetched_at(self, name):
+        entry = self._entry(name)
+        return entry["fetched_at"] if entry else None
+
+    def _refresh_in_background(self, name):
+        with self._lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+
+        def run():
+            try:
+                self.refresh(name)
+            except Exception as e:
+                print(f"Feed refresh failed for {name}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(name)
+
+        threading.Thread(target=run, name=f"feed-refresh-{name}", daemon=True).start()
+
+    def _entry(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+        disk_entry = self._read_from_disk(name)
+        if disk_entry is not None and (entry is None or disk_entry["fetched_at"] > entry["fetched_at"]):
+            with self._lock:
+                self._entries[name] = disk_entry
+            entry = disk_entry
+        return entry
+
+    def _path(self, name):
+        return self.cache_dir / f"{name}.json"
+
+    def _read_from_disk(self, name):
+        """Load the on-disk entry if another process (or a restart) has written a newer one"""
+        if self.cache_dir is None:
+            return None
+        try:
+            mtime = self._path(name).stat().st_mtime_ns
+            if self._disk_mtimes.get(name) == mtime:
+                return None
+            with open(self._path(name), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            self._disk_mtimes[name] = mtime
+            return entry
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_to_disk(self, name, entry):
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path(name).with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(name))
+        self._disk_mtimes[name] = self._path(name).stat().st_mtime_ns
+
+_feed_cache = None
+_feed_cache_lock = threading.Lock()
+
+def get_feed_cache():
+    """Return the process-wide FeedCache"""
+    global _feed_cache
+    with _feed_cache_lock:
+        if _feed_cache is None:
+            _feed_cache = FeedCache()
+        return _feed_cache
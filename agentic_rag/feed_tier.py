@@ -0,0 +1,75 @@
+import os
+import time
+import threading
+from .numpy_store import NumpyVectorStore
+from .feed_cache import get_feed_cache
+
+# While a feed has never been fetched successfully, a search retries it at most this often
+FEED_TIER_RETRY_SECONDS = float(os.getenv("RAG_FEED_TIER_RETRY_SECONDS", "60"))
+
+class FeedTier:
+    """Ephemeral in-memory vector tier for short-lived feed documents (weather, news).
+
+    ``sources`` maps a feed name in the FeedCache to a function returning its
+    documents. They are held in an unpersisted NumpyVectorStore that is
+    rebuilt only when one of the feeds has been refetched (its ``fetched_at``
+    changed). ``embeddings`` should be the uncached backend: vectors are kept
+    in memory for the texts of the current build only, so articles seen
+    before are not re-embedded and nothing of these short-lived documents
+    lands in the on-disk embedding cache or the persistent index.
+    ``version`` changes on every rebuild.
+    """
+
+    def __init__(self, embeddings, sources, feed_cache=None, retry_seconds=FEED_TIER_RETRY_SECONDS):
+        self.embeddings = embeddings
+        self.sources = dict(sources)
+        self.feed_cache = feed_cache or get_feed_cache()
+        self.retry_seconds = retry_seconds
+        self.version = 0
+        self._store = None
+        self._fetched_at = None
+        self._built_at = 0.0
+        self._vectors = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rebuild the store if a feed changed since the last build; returns the current store"""
+        fetched_at = self._feed_times()
+        with self._lock:
+            if self._store is not None:
+                if fetched_at == self._fetched_at:
+                    return self._store
+                if None in fetched_at and time.time() - self._built_at < self.retry_seconds:
+                    return self._store
+
+            documents = [doc for fetch in self.sources.values() for doc in fetch()]
+            store = NumpyVectorStore(self.embeddings)
+            if documents:
+                texts = [doc.page_content for doc in documents]
+                store.add_vectors(self._embed(texts), texts, metadatas=[doc.metadata for doc in documents])
+            self._store = store
+            # Building may have filled the feed cache, so read the times again
+            self._fetched_at = self._feed_times()
+            self._built_at = time.time()
+            self.version += 1
+            return store
+
+    def search_by_vector_with_scores(self, vector, k=15, filter=None):
+        """(document, cosine similarity) pairs from the feed documents"""
+        return self.refresh().similarity_search_by_vectors_with_scores([vector], k=k, filter=filter)[0]
+
+    def count(self):
+        return self._store.count() if self._store is not None else 0
+
+    def _embed(self, texts):
+        """Vectors for ``texts``, embedding only those not in the previous build"""
+        missing = sorted({text for text in texts if text not in self._vectors})
+        vectors = {text: self._vectors[text] for text in texts if text in self._vectors}
+        if missing:
+            vectors.update(zip(missing, self.embeddings.embed_documents(missing)))
+        # Texts that dropped out of the feeds are forgotten, so memory follows the feed size
+        self._vectors = vectors
+        return [vectors[text] for text in texts]
+
+    def _feed_times(self):
+        return tuple(self.feed_cache.fetched_at(name) for name in self.sources)
@@ -0,0 +1,369 @@
+import os
+import json
+import asyncio
+import time
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Any
+from langchain_community.vectorstores import Chroma
+from langchain.schema import BaseRetriever, Document
+from .query_filters import parse_query_filters, candidate_filters
+from .numpy_store import NumpyVectorStore
+
+INDEX_DIRECTORY = os.getenv("RAG_INDEX_DIR", "./chroma_db")
+INDEX_COLLECTION = os.getenv("RAG_INDEX_COLLECTION", "orbitai")
+# "chroma" (HNSW, default) or "numpy" (exact search over an in-memory float32 matrix)
+VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma")
+LOOKUP_BATCH_SIZE = 500
+# Part of every document id; bump it when document metadata changes so stored entries are rewritten
+INDEX_SCHEMA_VERSION = 3
+# A metadata filter that matches fewer documents than this falls back to a looser one
+MIN_FILTERED_RESULTS = int(os.getenv("RAG_MIN_FILTERED_RESULTS", "3"))
+# How long documents of a type are kept after they were first indexed, e.g. "weather=3h,news=1d"
+RETENTION = os.getenv("RAG_RETENTION", "weather=3h,news=1d")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_retention(spec):
+    """Turn "weather=3h,news=1d" into {"weather": 10800, "news": 86400}"""
+    retention = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        doc_type, duration = item.split("=", 1)
+        duration = duration.strip().lower()
+        unit = DURATION_UNITS.get(duration[-1:])
+        retention[doc_type.strip()] = float(duration[:-1]) * unit if unit else float(duration)
+    return retention
+
+def document_id(doc):
+    """Stable content-hash id for a document"""
+    payload = json.dumps(
+        {"schema": INDEX_SCHEMA_VERSION, "type": doc.metadata.get("type"), "content": doc.page_content},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class DocumentIndex:
+    """Persistent vector index that only embeds new or changed documents.
+
+    Every document is stored under its content hash, so re-ingesting the same
+    data is a no-op. Documents carrying a ``source_key`` metadata entry replace
+    the previous version stored under the same key. ``backend`` picks the
+    vector store: Chroma or the in-process NumpyVectorStore.
+    """
+
+    def __init__(self, embeddings, persist_directory=INDEX_DIRECTORY, collection_name=INDEX_COLLECTION, backend=VECTOR_BACKEND):
+        self.embeddings = embeddings
+        self.persist_directory = persist_directory
+        if backend == "numpy":
+            self.vectorstore = NumpyVectorStore(embeddings, persist_directory=persist_directory, collection_name=collection_name)
+        elif backend == "chroma":
+            self.vectorstore = Chroma(
+                collection_name=collection_name,
+                embedding_function=embeddings,
+                persist_directory=persist_directory
+            )
+        else:
+            raise ValueError(f"Unknown vector backend {backend!r}; expected 'chroma' or 'numpy'")
+        self.backend = backend
+        self._state_path = Path(persist_directory) / f"{collection_name}_state.json"
+        self._state_mtime = None
+        self._state = {"version": 0, "updated_at": None}
+
+    def count(self):
+        if self.backend == "numpy":
+            return self.vectorstore.count()
+        return self.vectorstore._collection.count()
+
+    def search(self, query, k=15, filter=None):
+        return self.vectorstore.similarity_search(query, k=k, filter=filter)
+
+    def search_by_vector(self, vector, k=15, filter=None):
+        return self.vectorstore.similarity_search_by_vector(vector, k=k, filter=filter)
+
+    def search_by_vector_with_scores(self, vector, k=15, filter=None):
+        """(document, cosine similarity) pairs, on the same scale as other tiers searched with the same embeddings"""
+        if self.backend == "numpy":
+            return self.vectorstore.similarity_search_by_vectors_with_scores([vector], k=k, filter=filter)[0]
+        results = self.vectorstore.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=filter)
+        # Chroma returns distances; for unit-length embeddings l2 (squared) is 2 - 2cos, cosine and ip are 1 - cos
+        space = (self.vectorstore._collection.metadata or {}).get("hnsw:space", "l2")
+        return [(doc, 1 - distance / 2 if space == "l2" else 1 - distance) for doc, distance in results]
+
+    def existing_ids(self, ids):
+        """Return the subset of ids already present in the index"""
+        found = set()
+        for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+            batch = ids[start:start + LOOKUP_BATCH_SIZE]
+            found.update(self.vectorstore.get(ids=batch, include=[])["ids"])
+        return found
+
+    def ids_for_source_keys(self, source_keys):
+        """Return ids of every stored document with one of the given source keys"""
+        found = set()
+        for start in range(0, len(source_keys), LOOKUP_BATCH_SIZE):
+            batch = source_keys[start:start + LOOKUP_BATCH_SIZE]
+            result = self.vectorstore.get(where={"source_key": {"$in": batch}}, include=[])
+            found.update(result["ids"])
+        return found
+
+    def metadata_where(self, where):
+        """Return {id: metadata} of every stored document matching a where clause"""
+        result = self.vectorstore.get(where=where, include=["metadatas"])
+        return dict(zip(result["ids"], result["metadatas"]))
+
+    def metadata_for_records(self, record_ids):
+        """Return {id: metadata} of every stored document from the given Mongo records"""
+        found = {}
+        for start in range(0, len(record_ids), LOOKUP_BATCH_SIZE):
+            batch = record_ids[start:start + LOOKUP_BATCH_SIZE]
+            found.update(self.metadata_where({"record_id": {"$in": batch}}))
+        return found
+
+    @contextmanager
+    def deferred_writes(self):
+        """Write the NumpyVectorStore files once when the block ends instead of on every add or delete.
+
+        Chroma writes through, so this is a no-op for it.
+        """
+        if self.backend != "numpy":
+            yield self
+            return
+        with self.vectorstore.deferred_save():
+            try:
+                yield self
+            finally:
+                self.flush()
+
+    def flush(self):
+        """Write out changes held back by ``deferred_writes`` (e.g. before recording a checkpoint)"""
+        if self.backend == "numpy" and self.vectorstore.flush():
+            # Readers may have cached answers under the version bumped before the files were written
+            self._bump_version()
+
+    def delete(self, ids):
+        """Remove documents by id; returns how many were removed"""
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+            self.vectorstore.delete(ids=ids[start:start + LOOKUP_BATCH_SIZE])
+        if ids:
+            self._bump_version()
+        return len(ids)
+
+    def expired_ids(self, retention, now=None):
+        """Ids of documents older than their type's retention; documents without ``ingested_at`` count as expired"""
+        now = time.time() if now is None else now
+        expired = []
+        for doc_type, seconds in retention.items():
+            for doc_id, metadata in self.metadata_where({"type": doc_type}).items():
+                if metadata.get("ingested_at", 0) < now - seconds:
+                    expired.append(doc_id)
+        return expired
+
+    def expire(self, retention=None):
+        """Delete documents past their retention; returns how many were removed"""
+        return self.delete(self.expired_ids(parse_retention(RETENTION) if retention is None else retention))
+
+    def redundant_ids(self):
+        """Ids of duplicate and superseded documents.
+
+        Duplicates share type and content (e.g. written by repeated
+        ``add_documents`` calls under random ids); one copy is kept, preferring
+        the one stored under its content hash. A document written under an
+        older schema is superseded once its source_key has a current document.
+        """
+        stored = self.vectorstore.get(include=["metadatas", "documents"])
+        by_content = {}
+        for doc_id, metadata, content in zip(stored["ids"], stored["metadatas"], stored["documents"]):
+            current_id = document_id(Document(page_content=content or "", metadata=metadata or {}))
+            by_content.setdefault(current_id, []).append((doc_id, metadata or {}))
+
+        redundant = []
+        current_keys = set()
+        outdated = []
+        for current_id, copies in by_content.items():
+            keep = next((copy for copy in copies if copy[0] == current_id), copies[0])
+            redundant.extend(doc_id for doc_id, _ in copies if doc_id != keep[0])
+            if keep[0] == current_id:
+                current_keys.add(keep[1].get("source_key"))
+            else:
+                outdated.append(keep)
+        redundant.extend(
+            doc_id for doc_id, metadata in outdated
+            if metadata.get("source_key") and metadata["source_key"] in current_keys
+        )
+        return redundant
+
+    def compact(self, retention=None, vacuum=False):
+        """Remove expired, duplicate and superseded documents; with ``vacuum`` also reclaim disk space.
+
+        Deleting is safe while other processes use the index. Vacuuming locks
+        the Chroma database while it runs, so do it with the server stopped.
+        """
+        size_before = self.disk_usage()
+        with self.deferred_writes():
+            expired = self.expire(retention)
+            redundant = self.delete(self.redundant_ids())
+        if vacuum:
+            self._vacuum()
+        stats = {
+            "expired": expired,
+            "redundant": redundant,
+            "count": self.count(),
+            "bytes_before": size_before,
+            "bytes_after": self.disk_usage()
+        }
+        print(
+            f"Compacted index: {expired} expired and {redundant} duplicate/superseded documents removed, "
+            f"{stats['count']} left, {size_before / 2 ** 20:.1f} MB -> {stats['bytes_after'] / 2 ** 20:.1f} MB on disk"
+        )
+        return stats
+
+    def disk_usage(self):
+        path = Path(self.persist_directory)
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) if path.exists() else 0
+
+    def _vacuum(self):
+        # NumpyVectorStore rewrites its files without deleted rows; Chroma reuses deleted
+        # HNSW slots, but its SQLite file only gives freed pages back with VACUUM
+        if self.backend != "chroma":
+            return
+        try:
+            from chromadb.db.impl.sqlite import SqliteDB
+            self.vectorstore._client._system.instance(SqliteDB).vacuum()
+        except Exception as e:
+            print(f"Could not vacuum the Chroma database: {e}")
+
+    def upsert(self, documents):
+        """Embed and store only documents that are not indexed yet.
+
+        New documents are stamped with ``ingested_at`` (for retention).
+        Returns a dict with the number of added, removed (superseded) and
+        unchanged documents.
+        """
+        unique = {}
+        for doc in documents:
+            unique.setdefault(document_id(doc), doc)
+
+        ids = list(unique)
+        existing = self.existing_ids(ids)
+        new_ids = [doc_id for doc_id in ids if doc_id not in existing]
+
+        source_keys = sorted({
+            unique[doc_id].metadata["source_key"]
+            for doc_id in new_ids
+            if unique[doc_id].metadata.get("source_key")
+        })
+        superseded = []
+        if source_keys:
+            superseded = sorted(self.ids_for_source_keys(source_keys) - set(ids))
+
+        if new_ids:
+            ingested_at = time.time()
+            self.vectorstore.add_documents(
+                [
+                    Document(page_content=unique[doc_id].page_content, metadata={**unique[doc_id].metadata, "ingested_at": ingested_at})
+                    for doc_id in new_ids
+                ],
+                ids=new_ids
+            )
+        if superseded:
+            self.vectorstore.delete(ids=superseded)
+        if new_ids or superseded:
+            self._bump_version()
+
+        return {"added": len(new_ids), "removed": len(superseded), "unchanged": len(existing)}
+
+    @property
+    def version(self):
+        """Monotonic counter that changes whenever the index content changes"""
+        return self._load_state()["version"]
+
+    def _load_state(self):
+        try:
+            mtime = self._state_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return self._state
+        if mtime != self._state_mtime:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+            self._state_mtime = mtime
+        return self._state
+
+    def get_state(self, key, default=None):
+        """Read a value stored next to the index, e.g. an ingest checkpoint"""
+        return self._load_state().get(key, default)
+
+    def set_state(self, key, value):
+        state = dict(self._load_state())
+        state[key] = value
+        self._write_state(state)
+
+    def _bump_version(self):
+        state = dict(self._load_state())
+        state["version"] = state.get("version", 0) + 1
+        state["updated_at"] = datetime.now().isoformat()
+        self._write_state(state)
+
+    def _write_state(self, state):
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._state_path)
+        self._state = state
+        self._state_mtime = self._state_path.stat().st_mtime_ns
+
+class IndexRetriever(BaseRetriever):
+    """Retriever over a DocumentIndex.
+
+    Document types, dates and hours mentioned in the query become metadata
+    pre-filters on the vector search; a filter that leaves fewer than
+    ``min_results`` documents is relaxed step by step down to an unfiltered
+    search. With a ``feed_tier`` (see feed_tier.FeedTier) its in-memory
+    results are merged with the index's by cosine similarity. With a
+    ``packer`` the results are then packed into its token budget before they
+    reach the prompt. On the async path the query is embedded with the backend's async
+    client and only the vector search itself runs in the loop's executor.
+    """
+    index: Any
+    k: int = 15
+    use_filters: bool = True
+    min_results: int = MIN_FILTERED_RESULTS
+    packer: Any = None
+    feed_tier: Any = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        vector = self.index.embeddings.embed_query(query)
+        return self._search(query, vector)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        vector = await self.index.embeddings.aembed_query(query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._search, query, vector)
+
+    def _search(self, query, vector):
+        wheres = candidate_filters(parse_query_filters(query)) if self.use_filters else [None]
+        for where in wheres:
+            docs = self._search_tiers(vector, where)
+            if where is None or len(docs) >= self.min_results:
+                break
+        return self.packer.pack(docs) if self.packer is not None else docs
+
+    def _search_tiers(self, vector, where):
+        if self.feed_tier is None:
+            return self.index.search_by_vector(vector, k=self.k, filter=where)
+        scored = self.index.search_by_vector_with_scores(vector, k=self.k, filter=where)
+        scored += self.feed_tier.search_by_vector_with_scores(vector, k=self.k, filter=where)
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return [doc for doc, _ in scored[:self.k]]
+
+if __name__ == "__main__":
+    from .newrag import ingest
+    print(f"Ingest finished: {ingest()}")
@@ -0,0 +1,128 @@
+import os
+import hashlib
+from collections import Counter, defaultdict
+from langchain.schema import Document
+from .context_packing import shingles
+
+SIMHASH_BITS = 64
+# Fingerprints this many bits apart or closer are treated as the same text
+SIMHASH_MAX_DISTANCE = int(os.getenv("RAG_SIMHASH_MAX_DISTANCE", "3"))
+# A document whose shingles are at least this much contained in a longer one is a fragment of it
+FRAGMENT_CONTAINMENT = float(os.getenv("RAG_FRAGMENT_CONTAINMENT", "0.8"))
+FRAGMENT_SEPARATOR = " | "
+
+def simhash(text, bits=SIMHASH_BITS):
+    """64-bit SimHash over word 3-shingles"""
+    weights = [0] * bits
+    for shingle, count in Counter(shingles(text)).items():
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=bits // 8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+def record_key(doc):
+    """Mongo record a fragment came from, derived from its source_key"""
+    source_key = doc.metadata.get("source_key") or ""
+    if source_key.startswith("mongodb:"):
+        return source_key.rsplit(":", 1)[0]
+    return None
+
+def merge_record_fragments(documents):
+    """Join the fragments of each Mongo record (per type) into one document, keeping first-seen order"""
+    groups = {}
+    merged = []
+    for doc in documents:
+        key = record_key(doc)
+        if key is None:
+            merged.append(doc)
+            continue
+        group_key = (key, doc.metadata.get("type"))
+        if group_key not in groups:
+            groups[group_key] = []
+            merged.append(group_key)
+        if doc.page_content not in groups[group_key]:
+            groups[group_key].append(doc.page_content)
+
+    result = []
+    for item in merged:
+        if isinstance(item, Document):
+            result.append(item)
+            continue
+        key, doc_type = item
+        result.append(Document(
+            page_content=FRAGMENT_SEPARATOR.join(groups[item]),
+            metadata={"type": doc_type, "source": "mongodb", "source_key": f"{key}:{doc_type}", "fragments": len(groups[item])}
+        ))
+    return result
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+def cluster_near_duplicates(documents, max_distance=SIMHASH_MAX_DISTANCE, containment=FRAGMENT_CONTAINMENT):
+    """Group documents that are near-duplicates or fragments of one another.
+
+    Near-duplicates are found by SimHash: the fingerprint is split into
+    ``max_distance + 1`` bands, so any pair within the distance shares at
+    least one band and only those pairs are compared. Fragments are found
+    through an inverted shingle index: a document is merged into a longer
+    one that contains ``containment`` of its shingles. Returns a list of
+    clusters, each a list of indexes into ``documents``.
+    """
+    doc_shingles = [shingles(doc.page_content) for doc in documents]
+    fingerprints = [simhash(doc.page_content) for doc in documents]
+    clusters = _UnionFind(len(documents))
+
+    bands = max_distance + 1
+    band_width = SIMHASH_BITS // bands
+    buckets = defaultdict(list)
+    for i, fingerprint in enumerate(fingerprints):
+        for band in range(bands):
+            buckets[(band, fingerprint >> (band * band_width) & ((1 << band_width) - 1))].append(i)
+    for members in buckets.values():
+        for position, i in enumerate(members):
+            for j in members[position + 1:]:
+                if bin(fingerprints[i] ^ fingerprints[j]).count("1") <= max_distance:
+                    clusters.union(i, j)
+
+    postings = defaultdict(set)
+    for i, items in enumerate(doc_shingles):
+        for shingle in items:
+            postings[shingle].add(i)
+    for i, items in enumerate(doc_shingles):
+        if not items:
+            continue
+        overlaps = Counter(j for shingle in items for j in postings[shingle] if j != i)
+        for j, shared in overlaps.items():
+            if len(doc_shingles[j]) >= len(items) and shared / len(items) >= containment:
+                clusters.union(i, j)
+
+    grouped = defaultdict(list)
+    for i in range(len(documents)):
+        grouped[clusters.find(i)].append(i)
+    return list(grouped.values())
+
+def canonical_chunks(documents, max_distance=SIMHASH_MAX_DISTANCE, containment=FRAGMENT_CONTAINMENT):
+    """Merge record fragments, then keep the longest document of every near-duplicate cluster.
+
+    Each canonical chunk records in ``cluster_size`` how many documents it
+    stands for.
+    """
+    merged = merge_record_fragments(documents)
+    chunks = []
+    for cluster in cluster_near_duplicates(merged, max_distance, containment):
+        canonical = max((merged[i] for i in cluster), key=lambda doc: len(doc.page_content))
+        chunks.append(Document(
+            page_content=canonical.page_content,
+            metadata={**canonical.metadata, "cluster_size": len(cluster)}
+        ))
+    return chunks
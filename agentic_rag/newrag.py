@@ -1,52 +1,147 @@
 import os
-import requests
+import sys
 import json
+import time
+import hashlib
+import asyncio
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
 from dotenv import load_dotenv
 from pymongo import MongoClient
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import Chroma
+from langchain_openai import ChatOpenAI
 from langchain.schema import Document
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+if __package__ in (None, ""):
+    # Started as a script (python newrag.py): import through the package so the relative imports resolve
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "agentic_rag"
+from .index import DocumentIndex, IndexRetriever, INDEX_COLLECTION
+from .embedding_cache import CachedEmbeddings
+from .embedding_backends import get_embeddings, EMBEDDING_BACKEND, DEFAULT_OPENAI_EMBEDDING_MODEL
+from .context_packing import ContextPacker
+from .feed_cache import get_feed_cache, WEATHER_API_URL, NEWS_API_URL
+from .feed_tier import FeedTier
+from .query_filters import calendar_metadata
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MONGODB_URL = os.getenv("MONGODB_URL")
-WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast?latitude=12.9165&longitude=79.1325&current=temperature_2m,wind_speed_10m,relative_humidity_2m&hourly=temperature_2m,precipitation"
-NEWS_API_URL = "https://saurav.tech/NewsAPI/top-headlines/category/general/in.json"
+# Per-source deadlines (seconds) for concurrent collection; late sources are skipped
+SOURCE_DEADLINES = {
+    "mongodb": float(os.getenv("RAG_MONGODB_DEADLINE_SECONDS", "15")),
+    "weather": float(os.getenv("RAG_WEATHER_DEADLINE_SECONDS", "5")),
+    "news": float(os.getenv("RAG_NEWS_DEADLINE_SECONDS", "5")),
+}
+
+# Long field contents are split into overlapping chunks of this many characters
+CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "1500"))
+CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))
+
+_text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+_collector_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="rag-collector")
 
 class DataCollector:
-    def __init__(self):
-        self.mongo_client = MongoClient(MONGODB_URL)
+    def __init__(self, mongo_client=None):
+        # A long-lived owner (RAGService) passes its pooled client
+        self.mongo_client = mongo_client or MongoClient(MONGODB_URL)
         self.db = self.mongo_client["OrbitAI"]
+        self.last_collection_report = {}
+    
+    def collect_all(self, deadlines=None, only=None):
+        """Fetch every source (or just those named in ``only``) in parallel, each bounded by its own deadline.
+
+        Sources that miss their deadline are left out and the documents that
+        did arrive are returned; per-source status and timings end up in
+        ``last_collection_report``.
+        """
+        deadlines = {**SOURCE_DEADLINES, **(deadlines or {})}
+        sources = {
+            "mongodb": self.get_emails_and_calendar,
+            "weather": self.get_weather_data,
+            "news": self.get_news_data,
+        }
+        if only is not None:
+            sources = {name: fetch for name, fetch in sources.items() if name in only}
+        started = time.monotonic()
+        futures = {name: _collector_executor.submit(self._timed, fetch) for name, fetch in sources.items()}
+
+        documents = []
+        report = {}
+        for name in sorted(futures, key=lambda source: deadlines[source]):
+            remaining = deadlines[name] - (time.monotonic() - started)
+            try:
+                docs, seconds = futures[name].result(timeout=max(remaining, 0))
+                documents.extend(docs)
+                report[name] = {"status": "ok", "documents": len(docs), "seconds": round(seconds, 3)}
+            except FutureTimeoutError:
+                print(f"{name} missed its {deadlines[name]}s deadline, continuing without it")
+                report[name] = {"status": "timeout", "documents": 0, "seconds": deadlines[name]}
+        self.last_collection_report = report
+        return documents
+    
+    def _timed(self, fetch):
+        started = time.monotonic()
+        docs = fetch()
+        return docs, time.monotonic() - started
     
-    def get_emails_and_calendar(self):
-        """Generic content extraction from MongoDB"""
+    def get_emails_and_calendar(self, limit=None):
+        """Generic content extraction from MongoDB: every record, or only the first ``limit`` as a sample.
+
+        Everything is held in memory; filling the index goes through
+        ``ingest`` (IndexSync), which streams the collection in batches.
+        """
+        from .stream_ingest import iter_records
         documents = []
         
         try:
-            collection = self.db["OrbitAI"]
-            
-            for record in collection.find().limit(50):
-                for key, value in record.items():
-                    if key == '_id':
-                        continue
-                    
-                    content = self._extract_content_from_field(key, value)
-                    if content:
-                        doc_type = self._determine_content_type(key, content)
-                        documents.append(Document(
-                            page_content=content,
-                            metadata={"type": doc_type, "source": "mongodb", "field": key[:50]}
-                        ))
+            for record in islice(iter_records(self.db["OrbitAI"]), limit):
+                documents.extend(self._record_to_documents(record))
                             
         except Exception as e:
             print(f"MongoDB error: {e}")
             
         return documents
     
+    def _record_to_documents(self, record):
+        documents = []
+        for key, value in record.items():
+            if key == '_id':
+                continue
+            
+            content = self._extract_content_from_field(key, value)
+            if content:
+                doc_type = self._determine_content_type(key, content)
+                metadata = {
+                    "type": doc_type,
+                    "source": "mongodb",
+                    "field": key[:50],
+                    "source_key": self._source_key(record['_id'], key),
+                    "record_id": str(record['_id'])
+                }
+                if doc_type == "calendar":
+                    # date/date_key/start_hour let retrieval pre-filter by day and time
+                    metadata.update(calendar_metadata(content))
+                documents.extend(self._chunk(Document(page_content=content, metadata=metadata)))
+        return documents
+    
+    def _chunk(self, doc):
+        """Split long content into overlapping chunks that share the field's source_key"""
+        if len(doc.page_content) <= CHUNK_SIZE:
+            return [doc]
+        chunks = _text_splitter.split_documents([doc])
+        for position, chunk in enumerate(chunks):
+            chunk.metadata["chunk"] = position
+        return chunks
+    
+    def _source_key(self, record_id, key):
+        """Stable identity of a Mongo field, used to replace its previous version in the index"""
+        key_hash = hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:16]
+        return f"mongodb:{record_id}:{key_hash}"
+    
     def _extract_content_from_field(self, key, value):
         """Generic method to extract meaningful content from any field"""
         if isinstance(key, str) and len(key) > 30:
@@ -75,7 +170,7 @@ class DataCollector:
                         if isinstance(v, str) and len(v) > 10:
                             text_parts.append(f"{k}: {v}")
             if text_parts:
-                return " | ".join(text_parts[:5])
+                return " | ".join(text_parts)
         
         return None
     
@@ -99,62 +194,100 @@ class DataCollector:
     
     def get_weather_data(self):
         """Fetch current weather data"""
-        try:
-            response = requests.get(WEATHER_API_URL)
-            data = response.json()
-            
-            current = data.get('current', {})
-            weather_content = f"""Current Weather:
+        return weather_documents()
+    
+    def get_news_data(self):
+        """Fetch latest news"""
+        return news_documents()
+
+def weather_documents():
+    """Current weather from the feed cache as a document"""
+    try:
+        data = get_feed_cache().get("weather")
+        
+        current = data.get('current', {})
+        weather_content = f"""Current Weather:
 Temperature: {current.get('temperature_2m', 'N/A')}°C
 Wind Speed: {current.get('wind_speed_10m', 'N/A')} m/s
 Humidity: {current.get('relative_humidity_2m', 'N/A')}%
 Time: {current.get('time', 'N/A')}"""
-            
-            return [Document(
-                page_content=weather_content,
-                metadata={"type": "weather", "source": "api"}
-            )]
-        except Exception as e:
-            print(f"Weather API error: {e}")
-            return []
-    
-    def get_news_data(self):
-        """Fetch latest news"""
-        try:
-            response = requests.get(NEWS_API_URL)
-            data = response.json()
-            
-            documents = []
-            for article in data.get('articles', [])[:3]:
-                news_content = f"""News: {article.get('title', 'No title')}
+        
+        return [Document(
+            page_content=weather_content,
+            metadata={"type": "weather", "source": "api", "source_key": "api:weather"}
+        )]
+    except Exception as e:
+        print(f"Weather API error: {e}")
+        return []
+
+def news_documents():
+    """Top headlines from the feed cache as documents"""
+    try:
+        data = get_feed_cache().get("news")
+        
+        documents = []
+        for rank, article in enumerate(data.get('articles', [])[:3]):
+            news_content = f"""News: {article.get('title', 'No title')}
 Description: {article.get('description', 'No description')}
 Source: {article.get('source', {}).get('name', 'Unknown')}"""
-                
-                documents.append(Document(
-                    page_content=news_content,
-                    metadata={"type": "news", "source": "api"}
-                ))
-                
-            return documents
-        except Exception as e:
-            print(f"News API error: {e}")
-            return []
+            
+            documents.append(Document(
+                page_content=news_content,
+                metadata={"type": "news", "source": "api", "source_key": f"api:news:{rank}"}
+            ))
+            
+        return documents
+    except Exception as e:
+        print(f"News API error: {e}")
+        return []
+
+# Short-lived sources served from the in-memory feed tier instead of the persistent index
+FEED_SOURCES = {"weather": weather_documents, "news": news_documents}
 
 class RAGSystem:
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
-        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY, temperature=0.1)
+    def __init__(self, http_client=None, http_async_client=None, embedding_backend=None):
+        # Optional shared httpx clients let a long-lived owner pool OpenAI connections
+        self.embedding_backend = embedding_backend or EMBEDDING_BACKEND
+        self.embeddings = CachedEmbeddings(get_embeddings(
+            self.embedding_backend,
+            http_client=http_client,
+            http_async_client=http_async_client
+        ))
+        self.llm = ChatOpenAI(
+            api_key=OPENAI_API_KEY,
+            temperature=0.1,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+        self.index = None
         self.vectorstore = None
+        # Weather and news are searched in memory and never written to the persistent index or the embedding cache
+        self.feed_tier = FeedTier(self.embeddings.embeddings, FEED_SOURCES)
+        self.prompt = None
+        self.retriever = None
+    
+    def load_index(self):
+        """Open the persistent index without collecting or embedding anything"""
+        if self.index is None:
+            self.index = DocumentIndex(self.embeddings, collection_name=self.collection_name())
+            self.vectorstore = self.index.vectorstore
+        return self.index
+    
+    def collection_name(self):
+        """Vectors of different models or sizes cannot share a collection, so non-default ones get their own"""
+        if self.embeddings.model == DEFAULT_OPENAI_EMBEDDING_MODEL:
+            return INDEX_COLLECTION
+        return f"{INDEX_COLLECTION}-{self.embeddings.model.replace(':', '-')}"
     
     def create_vectorstore(self, documents):
         if not documents:
             print("No documents to create vectorstore")
             return
-        self.vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            persist_directory="./chroma_db"
-        )
+        stats = self.load_index().upsert(documents)
+        stats["embedding_cache"] = self.embeddings.stats()
+        print(f"Index updated: {stats['added']} added, {stats['removed']} removed, {stats['unchanged']} unchanged")
+        print(f"Embedding cache: {stats['embedding_cache']['hits']} hits, {stats['embedding_cache']['misses']} misses")
+        return stats
         
     def setup_qa_chain(self):
         template = """You are a personal assistant with access to the user's emails, calendar, and other data stored in their database.
@@ -177,33 +310,65 @@ Instructions:
 
 Answer:"""
         
-        prompt = PromptTemplate(template=template, input_variables=["context", "question"])
+        # Kept on the instance so streaming callers can run retrieval and the LLM step separately
+        self.prompt = PromptTemplate(template=template, input_variables=["context", "question"])
+        # The 15 nearest documents are candidates; the packer keeps what fits the token budget
+        self.retriever = IndexRetriever(
+            index=self.load_index(),
+            k=15,
+            feed_tier=self.feed_tier,
+            packer=ContextPacker(model=self.llm.model_name)
+        )
         return RetrievalQA.from_chain_type(
             llm=self.llm,
             chain_type="stuff",
-            retriever=self.vectorstore.as_retriever(search_kwargs={"k": 15}),
-            chain_type_kwargs={"prompt": prompt}
+            retriever=self.retriever,
+            chain_type_kwargs={"prompt": self.prompt}
         )
 
-def rag_chat(query: str):
-    try:
-        collector = DataCollector()
+def _sync_mongodb(rag, mongo_client):
+    from .sync import IndexSync
+    return IndexSync(rag=rag, mongo_client=mongo_client).sync()
 
-        email_cal_docs = collector.get_emails_and_calendar()
-        weather_docs = collector.get_weather_data()
-        news_docs = collector.get_news_data()
+def ingest(rag=None, mongo_client=None):
+    """Sync Mongo changes into the persistent index.
 
-        all_docs = email_cal_docs + weather_docs + news_docs
+    Meant to run on a schedule or on demand. Records are read only past the
+    sync watermark (deletions are reconciled on their own, slower schedule),
+    only new or changed documents are embedded and documents past their
+    type's retention (RAG_RETENTION) are dropped. Weather and news live in
+    RAGSystem.feed_tier; copies persisted by older versions are removed.
+    """
+    collector = DataCollector(mongo_client)
+    rag = rag or RAGSystem()
+    index = rag.load_index()
+    with index.deferred_writes():
+        stats = _sync_mongodb(rag, collector.mongo_client)
+        stats["feeds_removed"] = index.delete(list(index.metadata_where({"source": "api"})))
+        stats["expired"] = index.expire()
+    return stats
 
-        if not all_docs:
-            return "error"
-        
-        rag = RAGSystem()
-        rag.create_vectorstore(all_docs)
-        qa_chain = rag.setup_qa_chain()
+async def aingest(rag=None, mongo_client=None):
+    """Async ingest: the pymongo sync runs in the loop's executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, ingest, rag, mongo_client)
 
-        result = qa_chain.invoke({"query": query})
-        return result['result']
+def rag_chat(query: str):
+    from .service import get_service
+    try:
+        return get_service().chat(query)
+    except Exception as e:
+        print(f"RAG chat error: {e}")
+        return "error"
+
+async def arag_chat(query: str):
+    """Async rag_chat: query embedding and LLM call are awaited, the vector
+    search and first-time setup run in the loop's executor"""
+    from .service import get_service
+    try:
+        loop = asyncio.get_running_loop()
+        service = await loop.run_in_executor(None, get_service)
+        return await service.achat(query)
     except Exception as e:
         print(f"RAG chat error: {e}")
         return "error"
@@ -213,28 +378,23 @@ def main():
     print("=" * 60)
     
     collector = DataCollector()
+    rag = RAGSystem()
     
-    print(" Collecting all data...")
-    email_cal_docs = collector.get_emails_and_calendar()
-    weather_docs = collector.get_weather_data()
-    news_docs = collector.get_news_data()
-    
-    all_documents = email_cal_docs + weather_docs + news_docs
-    print(f" Total documents collected: {len(all_documents)}")
+    print(" Syncing the whole MongoDB collection into the index...")
+    # Streams every record past the sync watermark; weather and news are not persisted,
+    # the QA chain searches them through rag.feed_tier
+    stats = ingest(rag, collector.mongo_client)
+    print(f" {stats['records']} new or changed records, {stats['added']} documents embedded, {rag.load_index().count()} documents indexed")
     
     # Show sample extracted content for debugging
-    print("\n Sample extracted content:")
-    for i, doc in enumerate(all_documents[:5]):
+    print("\n Sample extracted content (first 5 records):")
+    for i, doc in enumerate(collector.get_emails_and_calendar(limit=5)[:5]):
         print(f"{i+1}. [{doc.metadata['type']}]: {doc.page_content[:100]}...")
     
-    if not all_documents:
+    if rag.load_index().count() == 0:
         print(" No documents found.")
         return
     
-    rag = RAGSystem()
-    print("\n Creating vector database...")
-    rag.create_vectorstore(all_documents)
-    
     print("⚡ Setting up QA chain...")
     qa_chain = rag.setup_qa_chain()
     
@@ -0,0 +1,404 @@
+import os
+import json
+import uuid
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.vectorstores import VectorStore
+from langchain.schema import Document
+
+# How vectors are held in memory for the scan: float32 (exact), float16 or int8 (approximate, then rescored)
+VECTOR_STORAGE = os.getenv("RAG_VECTOR_STORAGE", "float32")
+STORAGE_TYPES = ("float32", "float16", "int8")
+# A quantized scan keeps k * RESCORE_FACTOR candidates and rescores them against the float32 vectors
+RESCORE_FACTOR = int(os.getenv("RAG_RESCORE_FACTOR", "4"))
+# Rows dequantized at a time during a scan, which bounds the temporary float32 copy
+SCAN_BLOCK_ROWS = 16384
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def quantize(vectors, storage):
+    """Return the (matrix, per-row scales) used for the scan; scales is None unless storage is int8"""
+    if storage == "float32":
+        return vectors, None
+    if storage == "float16":
+        return np.asarray(vectors, dtype=np.float16), None
+    if storage == "int8":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127 if len(vectors) else np.zeros(0, dtype=np.float32)
+        scales = np.where(scales == 0, 1, scales).astype(np.float32)
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales
+    raise ValueError(f"Unknown vector storage {storage!r}; expected one of {STORAGE_TYPES}")
+
+class NumpyVectorStore(VectorStore):
+    """Exact cosine-similarity store kept in one contiguous float32 matrix.
+
+    Rows are L2-normalised on insert, so a query (or a batch of queries) is
+    a single matrix product followed by ``argpartition`` for the top k.
+    Chroma-style ``where`` filters are evaluated as boolean masks over
+    per-key metadata columns. With a ``persist_directory`` the matrix is
+    saved as ``vectors.npy`` (memory-mapped on load) next to a JSON file
+    with ids, texts and metadata; a store reloads itself when another
+    process has rewritten them.
+
+    With ``storage`` set to float16 or int8 (per-row scaled), the scan runs
+    over a compact in-memory copy and only the best ``k * rescore_factor``
+    candidates are rescored against the memory-mapped float32 vectors.
+
+    Every add or delete rewrites the files, which costs O(N) per call; inside
+    ``deferred_save`` changes stay in memory until ``flush`` or the end of
+    the block, so a batched ingest writes the files once.
+    """
+
+    def __init__(self, embedding_function, persist_directory=None, collection_name="orbitai",
+                 storage=VECTOR_STORAGE, rescore_factor=RESCORE_FACTOR):
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown vector storage {storage!r}; expected one of {STORAGE_TYPES}")
+        self._embedding_function = embedding_function
+        self._path = Path(persist_directory) / f"{collection_name}.numpy" if persist_directory else None
+        self.storage = storage
+        self.rescore_factor = rescore_factor
+        self._lock = threading.RLock()
+        self._loaded_mtime = None
+        self._deferred = 0
+        self._dirty = False
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._compact, self._scales = self._vectors, None
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._rows = {}
+        self._columns = {}
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def count(self):
+        with self._lock:
+            self._reload_if_changed()
+            return len(self._ids)
+
+    def memory_stats(self):
+        """Bytes held in memory for the scan versus the float32 vectors kept on disk"""
+        with self._lock:
+            rows, dimensions = (len(self._ids), self._vectors.shape[1]) if len(self._ids) else (0, 0)
+            resident = self._compact.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+            return {
+                "rows": rows,
+                "dimensions": dimensions,
+                "storage": self.storage,
+                "scan_bytes": int(resident),
+                "float32_bytes": rows * dimensions * 4,
+                "bytes_per_vector": round(resident / rows, 1) if rows else 0.0
+            }
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self._embedding_function.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas=metadatas, ids=ids)
+
+    def add_vectors(self, vectors, texts, metadatas=None, ids=None):
+        """Store precomputed embeddings"""
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+        with self._lock:
+            self._reload_if_changed()
+            # Re-adding an existing id replaces it, like Chroma's upsert
+            self._delete_rows([doc_id for doc_id in ids if doc_id in self._rows])
+            # Only the new rows are quantized; int8 scales are per row, so they append too
+            compact, scales = quantize(vectors, self.storage)
+            if len(self._ids) == 0:
+                self._vectors, self._compact, self._scales = vectors, compact, scales
+            else:
+                self._vectors = np.concatenate([np.asarray(self._vectors), vectors])
+                self._compact = self._vectors if self.storage == "float32" else np.concatenate([self._compact, compact])
+                if scales is not None:
+                    self._scales = np.concatenate([self._scales, scales])
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                self._rows[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._texts.append(text)
+                self._metadatas.append(dict(metadata or {}))
+            self._columns = {}
+            self._changed()
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return None
+        with self._lock:
+            self._reload_if_changed()
+            self._delete_rows([doc_id for doc_id in ids if doc_id in self._rows])
+            self._columns = {}
+            self._changed()
+        return True
+
+    @contextmanager
+    def deferred_save(self):
+        """Keep adds and deletes in memory until the block ends (or ``flush`` is called)"""
+        with self._lock:
+            self._deferred += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._deferred -= 1
+                if not self._deferred:
+                    self.flush()
+
+    def flush(self):
+        """Write out pending changes; returns whether there were any"""
+        with self._lock:
+            if not self._dirty:
+                return False
+            self._save()
+            self._dirty = False
+            return True
+
+    def get(self, ids=None, where=None, limit=None, include=("metadatas", "documents")):
+        """Chroma-compatible subset of ``Collection.get``"""
+        with self._lock:
+            self._reload_if_changed()
+            if ids is not None:
+                rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+            else:
+                rows = list(range(len(self._ids)))
+            if where:
+                mask = self._mask(where)
+                rows = [row for row in rows if mask[row]]
+            if limit is not None:
+                rows = rows[:limit]
+            result = {"ids": [self._ids[row] for row in rows]}
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[row] for row in rows]
+            if "documents" in include:
+                result["documents"] = [self._texts[row] for row in rows]
+            if "embeddings" in include:
+                result["embeddings"] = np.asarray(self._vectors[rows])
+            return result
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_by_vector(self._embedding_function.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        vector = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vectors_with_scores([vector], k=k, filter=filter)[0]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vectors_with_scores([embedding], k=k, filter=filter)[0]]
+
+    def similarity_search_by_vectors(self, embeddings, k=4, filter=None):
+        """Batched search: one list of documents per query vector"""
+        return [
+            [doc for doc, _ in results]
+            for results in self.similarity_search_by_vectors_with_scores(embeddings, k=k, filter=filter)
+        ]
+
+    def similarity_search_by_vectors_with_scores(self, embeddings, k=4, filter=None):
+        with self._lock:
+            results = []
+            for rows, scores in self.top_k_rows(embeddings, k=k, filter=filter):
+                results.append([
+                    (Document(page_content=self._texts[row], metadata=dict(self._metadatas[row])), float(score))
+                    for row, score in zip(rows, scores)
+                ])
+            return results
+
+    def top_k_rows(self, embeddings, k=4, filter=None):
+        """Row numbers and cosine scores of the k best matches, one (rows, scores) pair per query"""
+        queries = _normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        with self._lock:
+            self._reload_if_changed()
+            empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            if not self._ids:
+                return [empty for _ in queries]
+            scores = self._scan(queries)
+            available = scores.shape[1]
+            if filter:
+                mask = self._mask(filter)
+                available = int(mask.sum())
+                scores[:, ~mask] = -np.inf
+            top = min(k, available)
+            if top == 0:
+                return [empty for _ in queries]
+
+            exact = self.storage == "float32"
+            shortlist = top if exact else min(top * self.rescore_factor, available)
+            results = []
+            for query, row_scores in zip(queries, scores):
+                best = np.argpartition(-row_scores, shortlist - 1)[:shortlist]
+                if exact:
+                    best_scores = row_scores[best]
+                else:
+                    best_scores = np.asarray(self._vectors[np.sort(best)]) @ query
+                    best = np.sort(best)
+                order = np.argsort(-best_scores)[:top]
+                results.append((best[order], best_scores[order]))
+            return results
+
+    def _scan(self, queries):
+        """Scores of every row against every query, computed from the scan matrix"""
+        if self.storage == "float32":
+            return queries @ np.asarray(self._vectors).T
+        scores = np.empty((len(queries), self._compact.shape[0]), dtype=np.float32)
+        for start in range(0, self._compact.shape[0], SCAN_BLOCK_ROWS):
+            block = self._compact[start:start + SCAN_BLOCK_ROWS].astype(np.float32)
+            block_scores = queries @ block.T
+            if self._scales is not None:
+                block_scores *= self._scales[start:start + SCAN_BLOCK_ROWS]
+            scores[:, start:start + SCAN_BLOCK_ROWS] = block_scores
+        return scores
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory=None, collection_name="orbitai", **kwargs):
+        store = cls(embedding, persist_directory=persist_directory, collection_name=collection_name)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def _delete_rows(self, ids):
+        if not ids:
+            return
+        drop = {self._rows[doc_id] for doc_id in ids}
+        keep = [row for row in range(len(self._ids)) if row not in drop]
+        self._vectors = np.asarray(self._vectors)[keep]
+        self._compact = self._vectors if self.storage == "float32" else self._compact[keep]
+        if self._scales is not None:
+            self._scales = self._scales[keep]
+        self._ids = [self._ids[row] for row in keep]
+        self._texts = [self._texts[row] for row in keep]
+        self._metadatas = [self._metadatas[row] for row in keep]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+
+    def _column(self, key):
+        """Metadata values of one key as (object array, float array with NaN for non-numbers)"""
+        if key not in self._columns:
+            values = np.array([metadata.get(key) for metadata in self._metadatas], dtype=object)
+            numbers = np.array([
+                float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+                for value in values
+            ], dtype=np.float64)
+            self._columns[key] = (values, numbers)
+        return self._columns[key]
+
+    def _mask(self, where):
+        """Boolean row mask for a Chroma-style where clause"""
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(len(self._ids), dtype=bool)
+                for clause in condition:
+                    any_mask |= self._mask(clause)
+                mask &= any_mask
+            else:
+                mask &= self._condition_mask(key, condition)
+        return mask
+
+    def _condition_mask(self, key, condition):
+        values, numbers = self._column(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        mask = np.ones(len(self._ids), dtype=bool)
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                mask &= values == operand
+            elif operator == "$ne":
+                mask &= values != operand
+            elif operator == "$in":
+                mask &= np.array([value in operand for value in values], dtype=bool)
+            elif operator == "$nin":
+                mask &= np.array([value not in operand for value in values], dtype=bool)
+            elif operator in ("$gt", "$gte", "$lt", "$lte"):
+                with np.errstate(invalid="ignore"):
+                    compare = {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}[operator]
+                    mask &= compare(numbers, float(operand))
+            else:
+                raise ValueError(f"Unsupported where operator {operator!r}")
+        return mask
+
+    def _files(self):
+        return self._path / "vectors.npy", self._path / "store.json"
+
+    def _compact_path(self):
+        return self._path / f"vectors.{self.storage}.npz"
+
+    def _load(self):
+        if self._path is None:
+            return
+        vectors_path, store_path = self._files()
+        try:
+            mtime = store_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        with open(store_path, "r", encoding="utf-8") as f:
+            store = json.load(f)
+        self._vectors = np.load(vectors_path, mmap_mode="r") if store["ids"] else np.zeros((0, 0), dtype=np.float32)
+        self._compact, self._scales = self._load_compact(len(store["ids"]))
+        self._ids, self._texts, self._metadatas = store["ids"], store["texts"], store["metadatas"]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._columns = {}
+        self._loaded_mtime = mtime
+
+    def _load_compact(self, rows):
+        """Read the saved scan matrix for this storage type, or build it from the float32 vectors"""
+        if self.storage != "float32" and rows:
+            try:
+                with np.load(self._compact_path()) as saved:
+                    if saved["vectors"].shape[0] == rows:
+                        return saved["vectors"], (saved["scales"] if self.storage == "int8" else None)
+            except (FileNotFoundError, KeyError, ValueError):
+                pass
+        return quantize(self._vectors, self.storage)
+
+    def _reload_if_changed(self):
+        # Unsaved changes win over whatever another process wrote meanwhile
+        if self._path is None or self._dirty:
+            return
+        try:
+            mtime = self._files()[1].stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._loaded_mtime:
+            self._load()
+
+    def _changed(self):
+        self._dirty = True
+        if not self._deferred:
+            self.flush()
+
+    def _save(self):
+        if self._path is None:
+            return
+        self._path.mkdir(parents=True, exist_ok=True)
+        vectors_path, store_path = self._files()
+        # vectors first, then the JSON whose mtime readers watch
+        with open(vectors_path.with_suffix(".tmp"), "wb") as f:
+            np.save(f, np.ascontiguousarray(self._vectors, dtype=np.float32))
+        os.replace(vectors_path.with_suffix(".tmp"), vectors_path)
+        if self.storage != "float32":
+            tmp_path = self._compact_path().with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                scales = self._scales if self._scales is not None else np.zeros(0, dtype=np.float32)
+                np.savez(f, vectors=self._compact, scales=scales)
+            os.replace(tmp_path, self._compact_path())
+            # Only the compact copy stays resident; full-precision rows are paged in for rescoring
+            if len(self._ids):
+                self._vectors = np.load(vectors_path, mmap_mode="r")
+        tmp_path = store_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}, f, ensure_ascii=False)
+        os.replace(tmp_path, store_path)
+        self._loaded_mtime = store_path.stat().st_mtime_ns
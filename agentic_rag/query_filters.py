@@ -0,0 +1,131 @@
+import os
+import re
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+QUERY_TIMEZONE = ZoneInfo(os.getenv("RAG_TIMEZONE", "Asia/Kolkata"))
+
+TYPE_KEYWORDS = {
+    "calendar": ["meeting", "meetings", "calendar", "schedule", "appointment", "appointments", "event", "events", "agenda", "free", "busy"],
+    "email": ["email", "emails", "mail", "mails", "inbox"],
+    "weather": ["weather", "temperature", "rain", "humidity", "wind", "forecast"],
+    "news": ["news", "headline", "headlines"],
+    "payment": ["payment", "payments", "upi", "transaction", "transactions", "subscription", "subscriptions"],
+    "job": ["job", "jobs", "hiring", "career", "position"],
+}
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+_TYPE_PATTERNS = {
+    doc_type: re.compile(r"\b(" + "|".join(words) + r")\b")
+    for doc_type, words in TYPE_KEYWORDS.items()
+}
+_ISO_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_WEEKDAY = re.compile(r"\b(" + "|".join(WEEKDAYS) + r")\b")
+_HOUR = re.compile(r"\b(\d{1,2})(?::\d{2})?\s*(am|pm)\b")
+_START = re.compile(r"start:\s*(\S+)")
+
+def date_key(day):
+    """Numeric YYYYMMDD form of a date, since Chroma only range-filters numbers"""
+    return day.year * 10000 + day.month * 100 + day.day
+
+def calendar_metadata(text):
+    """Date metadata for a calendar document, taken from its first 'start:' line"""
+    match = _START.search(text)
+    if not match:
+        return {}
+    try:
+        start = datetime.fromisoformat(match.group(1))
+    except ValueError:
+        return {}
+    return {"date": start.date().isoformat(), "date_key": date_key(start.date()), "start_hour": start.hour}
+
+def parse_query_filters(query, now=None):
+    """Pull document types, a date range and an hour out of a question.
+
+    Returns a dict with ``types`` (list), ``date_from``/``date_to`` (dates or
+    None) and ``hour`` (int or None). Only calendar documents carry dates, so
+    a date or hour without an explicit type implies the calendar.
+    """
+    text = query.lower()
+    today = (now or datetime.now(QUERY_TIMEZONE)).date()
+    filters = {"types": [], "date_from": None, "date_to": None, "hour": None}
+
+    filters["types"] = [doc_type for doc_type, pattern in _TYPE_PATTERNS.items() if pattern.search(text)]
+
+    iso_date = _ISO_DATE.search(text)
+    weekday = _WEEKDAY.search(text)
+    if iso_date:
+        try:
+            day = datetime.fromisoformat(iso_date.group(1)).date()
+            filters["date_from"] = filters["date_to"] = day
+        except ValueError:
+            pass
+    elif "tomorrow" in text:
+        filters["date_from"] = filters["date_to"] = today + timedelta(days=1)
+    elif "yesterday" in text:
+        filters["date_from"] = filters["date_to"] = today - timedelta(days=1)
+    elif "today" in text or "tonight" in text:
+        filters["date_from"] = filters["date_to"] = today
+    elif "next week" in text:
+        start = today - timedelta(days=today.weekday()) + timedelta(days=7)
+        filters["date_from"], filters["date_to"] = start, start + timedelta(days=6)
+    elif "this week" in text:
+        start = today - timedelta(days=today.weekday())
+        filters["date_from"], filters["date_to"] = start, start + timedelta(days=6)
+    elif weekday:
+        days_ahead = (WEEKDAYS.index(weekday.group(1)) - today.weekday()) % 7
+        filters["date_from"] = filters["date_to"] = today + timedelta(days=days_ahead)
+
+    hour = _HOUR.search(text)
+    if hour and 1 <= int(hour.group(1)) <= 12:
+        filters["hour"] = int(hour.group(1)) % 12 + (12 if hour.group(2) == "pm" else 0)
+
+    if not filters["types"] and (filters["date_from"] or filters["hour"] is not None):
+        filters["types"] = ["calendar"]
+    return filters
+
+def filters_key(filters):
+    """Hashable form of parsed filters, with the dates already resolved"""
+    return (
+        tuple(sorted(filters["types"])),
+        filters["date_from"].isoformat() if filters["date_from"] else None,
+        filters["date_to"].isoformat() if filters["date_to"] else None,
+        filters["hour"],
+    )
+
+def _where(conditions):
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+def candidate_filters(filters):
+    """Chroma ``where`` clauses from the strictest to none at all.
+
+    Retrieval tries them in order and keeps the first one that returns
+    enough documents, so an over-eager filter degrades to plain search.
+    """
+    type_conditions = []
+    if len(filters["types"]) == 1:
+        type_conditions.append({"type": filters["types"][0]})
+    elif filters["types"]:
+        type_conditions.append({"type": {"$in": filters["types"]}})
+
+    date_conditions = []
+    if filters["date_from"]:
+        date_conditions.append({"date_key": {"$gte": date_key(filters["date_from"])}})
+        date_conditions.append({"date_key": {"$lte": date_key(filters["date_to"])}})
+    hour_conditions = [{"start_hour": filters["hour"]}] if filters["hour"] is not None else []
+
+    candidates = []
+    for conditions in (
+        type_conditions + date_conditions + hour_conditions,
+        type_conditions + date_conditions,
+        type_conditions,
+    ):
+        where = _where(conditions)
+        if where is not None and where not in candidates:
+            candidates.append(where)
+    candidates.append(None)
+    return candidates
@@ -1,5 +1,8 @@
 from dotenv import load_dotenv
 import os
+import sys
+import json
+from pathlib import Path
 from typing import List, Any
 from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
@@ -7,16 +10,35 @@ from langchain_pinecone import PineconeVectorStore
 from langchain.chains import ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory
 from langchain.schema import BaseRetriever, Document
+if __package__ in (None, ""):
+    # Started as a script (python rag.py): import through the package so the relative imports resolve
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "agentic_rag"
+from .embedding_cache import CachedEmbeddings
+from .index import document_id
+from .near_duplicates import canonical_chunks
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX")
+# Namespace holding the deduplicated chunks written by ingest(); the raw fragments stay where they were
+PINECONE_NAMESPACE = os.getenv("PINECONE_CANONICAL_NAMESPACE", "canonical")
+PINECONE_K = int(os.getenv("RAG_PINECONE_K", "8"))
+# Ids written by the last ingest, so chunks that disappeared can be deleted; until it
+# exists no canonical ingest has run and retrieval stays on the default namespace
+CANONICAL_STATE_FILE = Path(os.getenv("PINECONE_CANONICAL_STATE_FILE", "./pinecone_canonical_ids.json"))
 
 os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
 
 class SimpleRetriever(BaseRetriever, BaseModel):
+    """Retriever over the canonical namespace (the default one before the first canonical ingest).
+
+    Fragments and near-duplicates are merged once at ingest time (see
+    ``ingest``), so a small k already returns distinct chunks and no
+    per-query dedupe is needed.
+    """
     retriever: BaseRetriever = Field(...)
     llm: Any = Field(...)
 
@@ -24,43 +46,66 @@ class SimpleRetriever(BaseRetriever, BaseModel):
         arbitrary_types_allowed = True
 
     def _get_relevant_documents(self, query: str) -> List[Document]:
-        # Get more documents since they're fragmented
-        docs = self.retriever.get_relevant_documents(query, k=100)
-        
-        # Group and combine related fragments
-        combined_content = []
-        seen_content = set()
-        
-        for doc in docs:
-            content = doc.page_content.strip()
-            if (len(content) > 10 and 
-                content not in seen_content and
-                not content.startswith('"')):
-                combined_content.append(content)
-                seen_content.add(content)
-        
-        # Create a single comprehensive document
-        if combined_content:
-            full_content = " | ".join(combined_content[:20])  # Take top 20 fragments
-            combined_doc = Document(
-                page_content=full_content,
-                metadata={"source": "combined", "type": "aggregated"}
-            )
-            print(f"Combined content preview: {full_content[:500]}...")
-            return [combined_doc]
-        
-        return docs[:5]  # Fallback to original docs
+        return self.retriever.invoke(query)
 
-def get_retriever():
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=OPENAI_API_KEY)
-    base_retriever = PineconeVectorStore.from_existing_index(
+def get_embeddings():
+    return CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small", api_key=OPENAI_API_KEY))
+
+def get_vectorstore(embeddings=None, namespace=PINECONE_NAMESPACE):
+    return PineconeVectorStore.from_existing_index(
         index_name=PINECONE_INDEX,
-        embedding=embeddings,
-    ).as_retriever(search_kwargs={"k": 250})
+        embedding=embeddings or get_embeddings(),
+        namespace=namespace,
+    )
+
+def retrieval_namespace():
+    """The canonical namespace once ingest() has filled it, otherwise the default namespace (None)"""
+    if CANONICAL_STATE_FILE.exists():
+        return PINECONE_NAMESPACE
+    print("No canonical ingest has run yet (python rag.py --ingest); searching the default namespace")
+    return None
+
+def get_retriever():
+    base_retriever = get_vectorstore(namespace=retrieval_namespace()).as_retriever(search_kwargs={"k": PINECONE_K})
     
     llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0, api_key=OPENAI_API_KEY)
     return SimpleRetriever(retriever=base_retriever, llm=llm)
 
+def ingest(mongo_client=None):
+    """Collect every Mongo record, cluster them into canonical chunks and upsert those into Pinecone.
+
+    Records are read through the same batched cursor as StreamingIngest, so
+    the whole collection is covered (clustering still needs all fragments
+    at once). Chunk ids are content hashes, so unchanged chunks are
+    rewritten in place and chunks that no longer exist are deleted.
+    """
+    from .newrag import DataCollector
+    from .stream_ingest import iter_records, iter_batches
+
+    collector = DataCollector(mongo_client)
+    documents = []
+    # A Mongo error propagates rather than leaving an empty list that would delete every chunk
+    for batch in iter_batches(iter_records(collector.db["OrbitAI"])):
+        documents.extend(doc for record in batch for doc in collector._record_to_documents(record))
+    chunks = canonical_chunks(documents)
+    ids = [document_id(chunk) for chunk in chunks]
+
+    previous_ids = set()
+    if CANONICAL_STATE_FILE.exists():
+        previous_ids = set(json.loads(CANONICAL_STATE_FILE.read_text(encoding="utf-8")))
+    stale_ids = sorted(previous_ids - set(ids))
+
+    vectorstore = get_vectorstore()
+    if chunks:
+        vectorstore.add_documents(chunks, ids=ids)
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids, namespace=PINECONE_NAMESPACE)
+    CANONICAL_STATE_FILE.write_text(json.dumps(ids), encoding="utf-8")
+
+    stats = {"fragments": len(documents), "chunks": len(chunks), "deleted": len(stale_ids)}
+    print(f"Canonical ingest: {stats['fragments']} fragments -> {stats['chunks']} chunks, {stats['deleted']} stale chunks deleted")
+    return stats
+
 def main():
     llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0, api_key=OPENAI_API_KEY)
     retriever = get_retriever()
@@ -94,4 +139,7 @@ def main():
         print("\n" + "-" * 50 + "\n")
 
 if __name__ == "__main__":
-    main()
+    if "--ingest" in sys.argv:
+        ingest()
+    else:
+        main()
@@ -0,0 +1,147 @@
+import os
+import asyncio
+import threading
+import httpx
+from pymongo import MongoClient
+from .newrag import RAGSystem, MONGODB_URL, ingest
+from .answer_cache import SemanticAnswerCache
+from .query_filters import parse_query_filters, filters_key
+
+MONGO_POOL_SIZE = int(os.getenv("RAG_MONGO_POOL_SIZE", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("RAG_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("RAG_HTTP_TIMEOUT_SECONDS", "60"))
+
+class RAGService:
+    """Process-lifetime owner of everything /chat needs.
+
+    Holds pooled Mongo and OpenAI HTTP clients, the persistent vector index
+    and the prebuilt RetrievalQA chain, so a query only pays for retrieval
+    and the LLM call. Repeated or near-identical questions are answered from
+    a semantic answer cache until the index or the in-memory feed tier
+    changes.
+    """
+
+    def __init__(self, mongo_url=MONGODB_URL):
+        limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+        self.http_client = httpx.Client(limits=limits, timeout=HTTP_TIMEOUT_SECONDS)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=HTTP_TIMEOUT_SECONDS)
+        self.mongo_client = MongoClient(mongo_url, maxPoolSize=MONGO_POOL_SIZE)
+
+        self.rag = RAGSystem(http_client=self.http_client, http_async_client=self.http_async_client)
+        self.index = self.rag.load_index()
+        self.qa_chain = self.rag.setup_qa_chain()
+        self.answer_cache = SemanticAnswerCache()
+        self._ingest_lock = threading.Lock()
+
+    def content_version(self):
+        """Changes whenever either retrieval tier does, which invalidates cached answers"""
+        self.rag.feed_tier.refresh()
+        return (self.index.version, self.rag.feed_tier.version)
+
+    def chat(self, query):
+        vector = self.rag.embeddings.embed_query(query)
+        key = filters_key(parse_query_filters(query))
+        version = self.content_version()
+        cached = self.answer_cache.get(vector, version, key)
+        if cached is not None:
+            return cached["answer"]
+        result = self.qa_chain.invoke({"query": query})
+        self.answer_cache.put(vector, version, result['result'], key=key)
+        return result['result']
+
+    async def achat(self, query):
+        vector = await self.rag.embeddings.aembed_query(query)
+        key = filters_key(parse_query_filters(query))
+        version = await asyncio.get_running_loop().run_in_executor(None, self.content_version)
+        cached = self.answer_cache.get(vector, version, key)
+        if cached is not None:
+            return cached["answer"]
+        result = await self.qa_chain.ainvoke({"query": query})
+        self.answer_cache.put(vector, version, result['result'], key=key)
+        return result['result']
+
+    async def astream_chat(self, query):
+        """Yield ("sources", [...]) once retrieval is done, then ("token", text) as the LLM streams.
+
+        Uses the same retriever and prompt as the QA chain, joining documents
+        the way the "stuff" chain does. A cached answer is sent as one token.
+        """
+        vector = await self.rag.embeddings.aembed_query(query)
+        key = filters_key(parse_query_filters(query))
+        version = await asyncio.get_running_loop().run_in_executor(None, self.content_version)
+        cached = self.answer_cache.get(vector, version, key)
+        if cached is not None:
+            yield "sources", cached["sources"] or []
+            yield "token", cached["answer"]
+            return
+
+        docs = await self.rag.retriever.ainvoke(query)
+        sources = [
+            {
+                "type": doc.metadata.get("type"),
+                "source": doc.metadata.get("source"),
+                "preview": doc.page_content[:200]
+            }
+            for doc in docs
+        ]
+        yield "sources", sources
+
+        context = "\n\n".join(doc.page_content for doc in docs)
+        prompt = self.rag.prompt.format(context=context, question=query)
+        tokens = []
+        async for chunk in self.rag.llm.astream(prompt):
+            if chunk.content:
+                tokens.append(chunk.content)
+                yield "token", chunk.content
+        self.answer_cache.put(vector, version, "".join(tokens), sources, key=key)
+
+    def ingest(self):
+        with self._ingest_lock:
+            return ingest(self.rag, mongo_client=self.mongo_client)
+
+    async def aingest(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.ingest)
+
+    def warm_up(self):
+        """Open the Mongo and OpenAI connections and load both retrieval tiers before the first query.
+
+        An empty index is not filled here (a first backfill embeds the whole
+        collection); the server's periodic ingest does that in the background.
+        """
+        self.mongo_client.admin.command("ping")
+        vector = self.rag.embeddings.embeddings.embed_query("warm-up")
+        self.index.search_by_vector(vector, k=1)
+        self.rag.feed_tier.refresh()
+
+    async def awarm_up(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.warm_up)
+
+    def close(self):
+        self.http_client.close()
+        self.mongo_client.close()
+
+    async def aclose(self):
+        await self.http_async_client.aclose()
+        self.close()
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    """Return the process-wide RAGService, creating it on first use"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            service = RAGService()
+            if service.index.count() == 0:
+                print("The RAG index is empty; fill it with python -m agentic_rag.sync or the server's periodic ingest")
+            _service = service
+        return _service
+
+def set_service(service):
+    """Install the RAGService owned by the application (or clear it with None)"""
+    global _service
+    with _service_lock:
+        _service = service
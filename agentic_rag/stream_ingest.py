@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import argparse
+from itertools import islice
+from bson import json_util
+from pymongo import MongoClient, ASCENDING
+from .newrag import DataCollector, RAGSystem, MONGODB_URL
+from .index import INDEX_SCHEMA_VERSION
+
+INGEST_BATCH_SIZE = int(os.getenv("RAG_INGEST_BATCH_SIZE", "200"))
+# Fields that never carry content (check_monog skips the same ones)
+INGEST_EXCLUDED_FIELDS = [field for field in os.getenv("RAG_INGEST_EXCLUDED_FIELDS", "id").split(",") if field]
+CHECKPOINT_KEY = "stream_ingest_last_id"
+# The NumpyVectorStore files are written (and the checkpoint moved) once per this many batches
+INGEST_FLUSH_BATCHES = int(os.getenv("RAG_INGEST_FLUSH_BATCHES", "20"))
+
+def iter_records(collection, after_id=None, batch_size=INGEST_BATCH_SIZE):
+    """Yield raw records in _id order, fetched from the server batch_size at a time"""
+    query = {"_id": {"$gt": after_id}} if after_id is not None else {}
+    projection = {field: 0 for field in INGEST_EXCLUDED_FIELDS} or None
+    cursor = collection.find(query, projection).sort("_id", ASCENDING).batch_size(batch_size)
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+def iter_batches(records, batch_size=INGEST_BATCH_SIZE):
+    """Group a record stream into lists, so only one batch is held in memory"""
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+class StreamingIngest:
+    """Ingests the whole OrbitAI collection into the persistent index with bounded memory.
+
+    Records are read through a batched cursor in ``_id`` order, turned into
+    (chunked) documents one batch at a time and upserted. Every
+    ``flush_batches`` batches the index is written out and the last ``_id``
+    is stored with it, so an interrupted run resumes from there.
+    """
+
+    checkpoint_key = CHECKPOINT_KEY
+
+    def __init__(self, rag=None, mongo_client=None, batch_size=INGEST_BATCH_SIZE, flush_batches=INGEST_FLUSH_BATCHES):
+        self.mongo_client = mongo_client or MongoClient(MONGODB_URL)
+        self.collector = DataCollector(self.mongo_client)
+        self.rag = rag or RAGSystem()
+        self.index = self.rag.load_index()
+        self.batch_size = batch_size
+        self.flush_batches = max(flush_batches, 1)
+
+    def checkpoint(self):
+        value = self.index.get_state(self.checkpoint_key)
+        return json_util.loads(value) if value is not None else None
+
+    def reset(self):
+        self.index.set_state(self.checkpoint_key, None)
+        # Documents written under an older schema get new ids, so every record has to be re-read
+        self.index.set_state(f"{self.checkpoint_key}:schema", INDEX_SCHEMA_VERSION)
+
+    def _records(self, collection):
+        return iter_records(collection, self.checkpoint(), self.batch_size)
+
+    def _advance(self, last_record):
+        self.index.set_state(self.checkpoint_key, json_util.dumps(last_record["_id"]))
+
+    def _checkpoint(self, last_record):
+        # The checkpoint may only move past records whose documents are on disk
+        self.index.flush()
+        self._advance(last_record)
+
+    def _ingest_batch(self, batch):
+        documents = [doc for record in batch for doc in self.collector._record_to_documents(record)]
+        stats = self.index.upsert(documents) if documents else {"added": 0, "removed": 0, "unchanged": 0}
+        return documents, stats
+
+    def run(self, full=False, max_batches=None):
+        """Ingest everything after the checkpoint (or from the start with ``full``); returns totals"""
+        if full or self.index.get_state(f"{self.checkpoint_key}:schema") != INDEX_SCHEMA_VERSION:
+            self.reset()
+        collection = self.collector.db["OrbitAI"]
+        started = time.monotonic()
+        totals = {"records": 0, "documents": 0, "added": 0, "removed": 0, "unchanged": 0, "batches": 0}
+
+        records = self._records(collection)
+        last_record = None
+        with self.index.deferred_writes():
+            for batch in iter_batches(records, self.batch_size):
+                documents, stats = self._ingest_batch(batch)
+                last_record = batch[-1]
+
+                totals["batches"] += 1
+                totals["records"] += len(batch)
+                totals["documents"] += len(documents)
+                for key in ("added", "removed", "unchanged"):
+                    totals[key] += stats[key]
+                if totals["batches"] % self.flush_batches == 0:
+                    self._checkpoint(last_record)
+                self._report(totals, started)
+                if max_batches is not None and totals["batches"] >= max_batches:
+                    break
+            if last_record is not None:
+                self._checkpoint(last_record)
+
+        totals["seconds"] = round(time.monotonic() - started, 3)
+        totals["records_per_second"] = round(totals["records"] / totals["seconds"], 1) if totals["seconds"] else 0.0
+        totals["embedding_cache"] = self.rag.embeddings.stats()
+        return totals
+
+    def _report(self, totals, started):
+        elapsed = time.monotonic() - started
+        rate = totals["records"] / elapsed if elapsed else 0.0
+        print(
+            f"Batch {totals['batches']}: {totals['records']} records, {totals['documents']} documents "
+            f"({totals['added']} added, {totals['unchanged']} unchanged) - {rate:.1f} records/s"
+        )
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Stream the full OrbitAI collection into the RAG index")
+    arg_parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and start from the first record")
+    arg_parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Records per cursor batch and upsert")
+    arg_parser.add_argument("--max-batches", type=int, help="Stop after this many batches (resume later)")
+    args = arg_parser.parse_args(argv)
+
+    totals = StreamingIngest(batch_size=args.batch_size).run(full=args.full, max_batches=args.max_batches)
+    print(
+        f"Ingested {totals['records']} records into {totals['documents']} documents in {totals['seconds']}s "
+        f"({totals['records_per_second']} records/s, {totals['added']} embedded, {totals['removed']} superseded)"
+    )
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import argparse
+from bson import json_util
+from pymongo import ASCENDING
+from .stream_ingest import StreamingIngest, INGEST_BATCH_SIZE, INGEST_EXCLUDED_FIELDS
+
+# "_id" follows inserts through the ObjectId order; a timestamp field such as
+# "updated_at" also picks up records modified in place
+SYNC_WATERMARK_FIELD = os.getenv("RAG_SYNC_WATERMARK_FIELD", "_id")
+SYNC_INTERVAL_SECONDS = float(os.getenv("RAG_SYNC_INTERVAL_SECONDS", "30"))
+# Deleted records are found by comparing every _id, so this runs far less often than the delta sync
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("RAG_RECONCILE_INTERVAL_SECONDS", "3600"))
+RECONCILED_AT_KEY = "sync_reconciled_at"
+
+def record_id_of(metadata):
+    """Mongo _id (as a string) a stored document came from, or None for non-Mongo documents"""
+    if metadata.get("record_id"):
+        return metadata["record_id"]
+    source_key = metadata.get("source_key") or ""
+    if source_key.startswith("mongodb:"):
+        return source_key.split(":")[1]
+    return None
+
+def iter_updated_records(collection, field, after=None, batch_size=INGEST_BATCH_SIZE):
+    """Yield records ordered by (field, _id) that come after the stored (value, _id) watermark.
+
+    Records without the field sort first, so they are only seen by a full sync.
+    """
+    query = {}
+    if after is not None:
+        query = {"$or": [
+            {field: {"$gt": after["value"]}},
+            {field: after["value"], "_id": {"$gt": after["_id"]}}
+        ]}
+    projection = {name: 0 for name in INGEST_EXCLUDED_FIELDS if name != field} or None
+    cursor = collection.find(query, projection).sort([(field, ASCENDING), ("_id", ASCENDING)]).batch_size(batch_size)
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+class IndexSync(StreamingIngest):
+    """Keeps the RAG index in step with OrbitAI.OrbitAI by processing only the delta.
+
+    Each ``sync`` reads the records past the high-water mark, re-indexes them
+    (dropping documents of fields a record no longer has) and moves the mark.
+    With the default ``_id`` watermark it shares its checkpoint with
+    ``StreamingIngest``, so a backfill and later syncs continue one another.
+    Deleted records are removed by ``reconcile``, which runs at most every
+    ``reconcile_interval`` seconds.
+    """
+
+    def __init__(self, rag=None, mongo_client=None, batch_size=INGEST_BATCH_SIZE,
+                 watermark_field=SYNC_WATERMARK_FIELD, reconcile_interval=RECONCILE_INTERVAL_SECONDS):
+        super().__init__(rag=rag, mongo_client=mongo_client, batch_size=batch_size)
+        self.watermark_field = watermark_field
+        self.reconcile_interval = reconcile_interval
+        if watermark_field != "_id":
+            self.checkpoint_key = f"sync_watermark:{watermark_field}"
+
+    def sync(self, full=False, reconcile=None):
+        """Index the delta since the last sync; reconcile deletions too when due (or when asked)"""
+        totals = self.run(full=full)
+        if reconcile is None:
+            reconcile = self.reconcile_due()
+        if reconcile:
+            totals["reconciled"] = self.reconcile()
+        return totals
+
+    def reconcile_due(self):
+        reconciled_at = self.index.get_state(RECONCILED_AT_KEY)
+        return reconciled_at is None or time.time() - reconciled_at >= self.reconcile_interval
+
+    def reconcile(self):
+        """Delete indexed documents whose Mongo record no longer exists"""
+        collection = self.collector.db["OrbitAI"]
+        live = {str(record["_id"]) for record in collection.find({}, {"_id": 1}).batch_size(5000)}
+        indexed = self.index.metadata_where({"source": "mongodb"})
+        stale = [
+            doc_id for doc_id, metadata in indexed.items()
+            if record_id_of(metadata) is not None and record_id_of(metadata) not in live
+        ]
+        removed = self.index.delete(stale)
+        self.index.set_state(RECONCILED_AT_KEY, time.time())
+        print(f"Reconciled {len(live)} records: {removed} documents of deleted records removed")
+        return {"live_records": len(live), "removed": removed}
+
+    def run_forever(self, interval=SYNC_INTERVAL_SECONDS):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Sync failed: {e}")
+            time.sleep(interval)
+
+    def _records(self, collection):
+        if self.watermark_field == "_id":
+            return super()._records(collection)
+        return iter_updated_records(collection, self.watermark_field, self.checkpoint(), self.batch_size)
+
+    def _advance(self, last_record):
+        if self.watermark_field == "_id":
+            return super()._advance(last_record)
+        watermark = {"value": last_record.get(self.watermark_field), "_id": last_record["_id"]}
+        self.index.set_state(self.checkpoint_key, json_util.dumps(watermark))
+
+    def _ingest_batch(self, batch):
+        documents, stats = super()._ingest_batch(batch)
+        # A field removed from an updated record leaves documents under a source_key nothing writes any more
+        current = {doc.metadata.get("source_key") for doc in documents}
+        existing = self.index.metadata_for_records([str(record["_id"]) for record in batch])
+        stats["removed"] += self.index.delete([
+            doc_id for doc_id, metadata in existing.items() if metadata.get("source_key") not in current
+        ])
+        return documents, stats
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Incrementally sync OrbitAI.OrbitAI into the RAG index")
+    arg_parser.add_argument("--loop", action="store_true", help="Keep syncing every --interval seconds")
+    arg_parser.add_argument("--interval", type=float, default=SYNC_INTERVAL_SECONDS)
+    arg_parser.add_argument("--full", action="store_true", help="Ignore the watermark and re-read every record")
+    arg_parser.add_argument("--reconcile", action="store_true", help="Check for deleted records even if not due")
+    arg_parser.add_argument("--watermark-field", default=SYNC_WATERMARK_FIELD)
+    args = arg_parser.parse_args(argv)
+
+    syncer = IndexSync(watermark_field=args.watermark_field)
+    if args.loop:
+        syncer.run_forever(args.interval)
+        return
+    totals = syncer.sync(full=args.full, reconcile=True if args.reconcile else None)
+    print(
+        f"Synced {totals['records']} changed records in {totals['seconds']}s "
+        f"({totals['added']} documents embedded, {totals['removed']} removed)"
+    )
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
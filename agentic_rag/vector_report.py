@@ -0,0 +1,102 @@
+import sys
+import time
+import argparse
+import numpy as np
+from .numpy_store import NumpyVectorStore, STORAGE_TYPES, RESCORE_FACTOR, _normalize_rows
+from .embedding_backends import supports_dimensions, SHORTENABLE_MODEL_PREFIX
+
+def recall_at_k(truth, found, k):
+    return len(set(truth[:k]) & set(found[:k])) / k if k else 0.0
+
+def _top_rows(store, queries, k, exclude):
+    """Top-k rows per query, leaving out the query's own row when it comes from the corpus"""
+    results = []
+    for (rows, _), own_row in zip(store.top_k_rows(queries, k=k + 1), exclude):
+        results.append([row for row in rows.tolist() if row != own_row][:k])
+    return results
+
+def recall_memory_report(vectors, queries, exclude=None, dimensions=None, storages=STORAGE_TYPES, k=10, rescore_factor=RESCORE_FACTOR):
+    """Recall@k and scan memory for every (dimensions, storage) setting.
+
+    Ground truth is exact float32 search at full size. Smaller sizes are
+    taken by truncating and renormalising the stored vectors, which is how
+    text-embedding-3 models shorten their output; for other models the
+    truncated recall means nothing.
+    """
+    vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+    queries = _normalize_rows(np.asarray(queries, dtype=np.float32))
+    exclude = exclude if exclude is not None else [None] * len(queries)
+    full_size = vectors.shape[1]
+    dimensions = sorted({d for d in (dimensions or [full_size]) if d <= full_size}, reverse=True)
+
+    truth_store = NumpyVectorStore(None, storage="float32")
+    truth_store.add_vectors(vectors, [""] * len(vectors))
+    truth = _top_rows(truth_store, queries, k, exclude)
+
+    rows = []
+    for size in dimensions:
+        reduced = _normalize_rows(vectors[:, :size])
+        reduced_queries = _normalize_rows(queries[:, :size])
+        for storage in storages:
+            store = NumpyVectorStore(None, storage=storage, rescore_factor=rescore_factor)
+            store.add_vectors(reduced, [""] * len(reduced))
+            started = time.perf_counter()
+            found = _top_rows(store, reduced_queries, k, exclude)
+            seconds = time.perf_counter() - started
+            memory = store.memory_stats()
+            rows.append({
+                "dimensions": size,
+                "storage": storage,
+                "recall": round(float(np.mean([recall_at_k(t, f, k) for t, f in zip(truth, found)])), 4),
+                "bytes_per_vector": memory["bytes_per_vector"],
+                "scan_mb": round(memory["scan_bytes"] / 2 ** 20, 2),
+                "ms_per_query": round(seconds * 1000 / len(queries), 3)
+            })
+    return rows
+
+def print_report(rows, k, documents):
+    print(f"Recall@{k} vs memory over {documents} documents")
+    print(f"{'dims':>6} {'storage':>8} {'recall':>8} {'bytes/vec':>10} {'scan MB':>9} {'ms/query':>9}")
+    for row in rows:
+        print(
+            f"{row['dimensions']:>6} {row['storage']:>8} {row['recall']:>8.4f} "
+            f"{row['bytes_per_vector']:>10} {row['scan_mb']:>9} {row['ms_per_query']:>9}"
+        )
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Recall-vs-memory report for reduced and quantized embeddings")
+    arg_parser.add_argument("--dimensions", default="", help="Comma-separated sizes to try, e.g. 1536,768,512,256 (default: full size only)")
+    arg_parser.add_argument("--storage", default=",".join(STORAGE_TYPES), help="Comma-separated storage types")
+    arg_parser.add_argument("--k", type=int, default=10)
+    arg_parser.add_argument("--sample", type=int, default=200, help="Corpus documents used as queries when --queries is not given")
+    arg_parser.add_argument("--queries", help="File with one question per line, embedded with the configured backend")
+    args = arg_parser.parse_args(argv)
+    dimensions = [int(d) for d in args.dimensions.split(",") if d.strip()] or None
+
+    from .newrag import RAGSystem
+    rag = RAGSystem()
+    stored = rag.load_index().vectorstore.get(include=["embeddings"])
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+    if len(vectors) == 0:
+        print("The index is empty; run an ingest first")
+        return
+    model = getattr(rag.embeddings.embeddings, "model", None)
+    if dimensions and min(dimensions) < vectors.shape[1] and not supports_dimensions(model):
+        arg_parser.error(f"--dimensions below {vectors.shape[1]} needs a {SHORTENABLE_MODEL_PREFIX} model; the index was embedded with {model}")
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        queries = np.asarray(rag.embeddings.embed_documents(questions), dtype=np.float32)
+        exclude = None
+    else:
+        rng = np.random.default_rng(0)
+        exclude = rng.choice(len(vectors), size=min(args.sample, len(vectors)), replace=False).tolist()
+        queries = vectors[exclude]
+
+    storages = [s.strip() for s in args.storage.split(",") if s.strip()]
+    rows = recall_memory_report(vectors, queries, exclude, dimensions, storages, k=args.k)
+    print_report(rows, args.k, len(vectors))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
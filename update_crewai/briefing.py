@@ -0,0 +1,24 @@
+import os
+import asyncio
+
+# Written next to this module so callers in other working directories find it
+BRIEFING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daily_briefing.md")
+# Structured copy of the same briefing, so readers don't have to parse the markdown
+BRIEFING_JSON_FILE = os.path.splitext(BRIEFING_FILE)[0] + ".json"
+
+def generate_briefing(mode=None):
+    """Run the briefing workflow in this process and return its structured result.
+
+    The dict holds the raw section texts, the parsed ``sections``, the markdown
+    ``content``, ``generated_at`` and ``metrics``. The same briefing is written
+    to BRIEFING_FILE and, as JSON, to BRIEFING_JSON_FILE.
+    """
+    # Imported here: the crew builds its LLM clients at import time, and readers of
+    # the artifact paths (the web server) must not depend on that
+    from crew import DailyBriefingCrew
+    return DailyBriefingCrew(mode=mode).run_daily_workflow()
+
+async def agenerate_briefing(mode=None, executor=None):
+    """Async wrapper: runs the workflow in ``executor`` so the event loop stays free"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, generate_briefing, mode)
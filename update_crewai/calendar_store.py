@@ -0,0 +1,171 @@
+import os
+import sys
+from datetime import datetime, time, timedelta
+import pytz
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from dotenv import load_dotenv
+from pymongo import MongoClient, ASCENDING, UpdateOne
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL")
+IST = pytz.timezone('Asia/Kolkata')
+WRITE_BATCH_SIZE = 500
+# Events added to or removed from an existing record are only seen by a full pass, so one runs this often
+CALENDAR_RECONCILE_SECONDS = float(os.getenv("CALENDAR_RECONCILE_SECONDS", "86400"))
+
+def is_event_key(key):
+    """Same key test the briefing tools used when scanning raw records"""
+    return key.startswith('calendar:') or key.startswith('id:') and 'name:' in key and 'start:' in key
+
+def parse_event_blocks(key):
+    """Split a key-encoded calendar field into one dict per event"""
+    events = []
+    # Split by 'id:' to get multiple events from one field
+    for block in key.split('id:')[1:]:
+        if not block.strip():
+            continue
+
+        lines = block.strip().split('\n')
+        event_data = {}
+
+        # First line is the event ID
+        if lines:
+            event_data['id'] = lines[0].strip()
+
+        for line in lines[1:]:
+            if ':' in line:
+                k, v = line.split(':', 1)
+                event_data[k.strip()] = v.strip()
+
+        if 'name' in event_data and 'start' in event_data and 'id' in event_data:
+            events.append(event_data)
+    return events
+
+def parse_event_time(value):
+    """Parse an ISO timestamp into an aware datetime, assuming IST when no offset is given"""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = IST.localize(dt)
+    return dt
+
+class CalendarEventStore:
+    """Structured, date-indexed copy of the calendar events embedded in OrbitAI keys.
+
+    ``sync`` parses only raw records newer than the last processed ``_id`` and
+    upserts them into the ``events`` collection, so looking up a day's events
+    is an indexed range query on ``start``. Events are stored in field names,
+    so a record can gain or lose events in place; once every
+    ``reconcile_interval`` seconds (or with ``full``) all records are
+    re-parsed and events that no longer exist in any record are deleted.
+    """
+
+    def __init__(self, client=None, reconcile_interval=CALENDAR_RECONCILE_SECONDS):
+        self.client = client or MongoClient(MONGODB_URL)
+        db = self.client['OrbitAI']
+        self.source = db['OrbitAI']
+        self.events = db['events'].with_options(codec_options=CodecOptions(tz_aware=True))
+        self.sync_state = db['events_sync_state'].with_options(codec_options=CodecOptions(tz_aware=True))
+        self.reconcile_interval = reconcile_interval
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        self.events.create_index([("start", ASCENDING), ("event_id", ASCENDING)])
+        self.events.create_index("event_id", unique=True)
+        self.events.create_index("generation")
+        self._indexes_ready = True
+
+    def reconcile_due(self, state):
+        reconciled_at = state.get("reconciled_at")
+        return reconciled_at is None or (datetime.now(IST) - reconciled_at).total_seconds() >= self.reconcile_interval
+
+    def sync(self, full=False):
+        """Parse raw records into the events collection; returns the number of events written or deleted"""
+        self.ensure_indexes()
+        state = self.sync_state.find_one({"_id": "calendar"}) or {}
+        full = full or state.get("last_id") is None or self.reconcile_due(state)
+        query = {} if full else {"_id": {"$gt": state["last_id"]}}
+        # Every event seen in this pass is tagged with it; after a full pass the untagged ones are gone
+        generation = ObjectId()
+
+        operations = []
+        written = 0
+        last_id = None
+        for record in self.source.find(query).sort("_id", ASCENDING):
+            last_id = record["_id"]
+            for key in record.keys():
+                if not isinstance(key, str) or not is_event_key(key):
+                    continue
+                for event in parse_event_blocks(key):
+                    start = parse_event_time(event.get('start'))
+                    if start is None:
+                        continue
+                    operations.append(UpdateOne(
+                        {"event_id": event['id']},
+                        {"$set": {
+                            "event_id": event['id'],
+                            "name": event.get('name'),
+                            "start": start,
+                            "end": parse_event_time(event.get('end')),
+                            "organizer": event.get('organizer'),
+                            "status": event.get('status'),
+                            "record_id": record["_id"],
+                            "generation": generation
+                        }},
+                        upsert=True
+                    ))
+            if len(operations) >= WRITE_BATCH_SIZE:
+                written += self._flush(operations)
+                operations = []
+
+        written += self._flush(operations)
+        update = {"synced_at": datetime.now(IST)}
+        if last_id is not None:
+            update["last_id"] = last_id
+        if full:
+            written += self.events.delete_many({"generation": {"$ne": generation}}).deleted_count
+            update["reconciled_at"] = update["synced_at"]
+        self.sync_state.update_one({"_id": "calendar"}, {"$set": update}, upsert=True)
+        return written
+
+    def _flush(self, operations):
+        if not operations:
+            return 0
+        result = self.events.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def events_between(self, start, end):
+        self.ensure_indexes()
+        return list(self.events.find({"start": {"$gte": start, "$lt": end}}).sort("start", ASCENDING))
+
+    def events_for_day(self, day):
+        start = IST.localize(datetime.combine(day, time.min))
+        return self.events_between(start, start + timedelta(days=1))
+
+    def todays_events(self):
+        return self.events_for_day(datetime.now(IST).date())
+
+def format_events(events):
+    """Render events the way the briefing expects: one '• name at HH:MM AM' line each"""
+    lines = [f"• {event.get('name')} at {event['start'].astimezone(IST).strftime('%I:%M %p')}" for event in events]
+    return "\n".join(lines) if lines else "No calendar events found for today."
+
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = CalendarEventStore()
+    return _store
+
+if __name__ == "__main__":
+    changed = get_store().sync(full="--full" in sys.argv)
+    print(f"Synced calendar events: {changed} written or deleted")
@@ -1,9 +1,38 @@
+import os
+import json
+import time
+import contextvars
 import tasks
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from langchain_community.callbacks import get_openai_callback
 from debug_calendar import get_todays_calendar_events  # Import the function
+from briefing import BRIEFING_FILE
+
+# "agent" routes every fetch through a zero-shot agent, "direct" calls the tools
+# itself and only uses the LLM for suggestions
+BRIEFING_MODE = os.getenv("BRIEFING_MODE", "agent")
+BRIEFING_MODES = ("agent", "direct")
+
+def build_briefing_sections(events: str, priority_tasks: str, news_weather: str, suggestions: str):
+    """Structured sections, matching what parsing daily_briefing.md would give back"""
+    def lines(text):
+        return [line.strip() for line in text.split('\n') if line.strip()]
+
+    return {
+        "events": lines(events),
+        "tasks": lines(priority_tasks),
+        "news": lines(news_weather),
+        "suggestions": [
+            line for line in lines(suggestions)
+            if not line.startswith('#') and not line.startswith('*') and not line.startswith('---')
+        ]
+    }
 
 def save_briefing_to_md(filename: str, events: str, priority_tasks: str, news_weather: str, suggestions: str):
-    today_date = datetime.now().strftime("%B %d, %Y")
+    """Write the markdown briefing plus a JSON artifact next to it; returns the artifact"""
+    now = datetime.now()
+    today_date = now.strftime("%B %d, %Y")
     
     # Format events with bullet points
     formatted_events = "\n".join([f"• {event}" for event in events.split('\n') if event.strip()])
@@ -41,33 +70,80 @@ Your personalized overview for today
     with open(filename, "w", encoding="utf-8") as f:
         f.write(content)
     
-    print(f"Daily briefing saved to {filename}")
+    artifact = {
+        "generated_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "content": content,
+        "sections": build_briefing_sections(events, priority_tasks, news_weather, suggestions)
+    }
+    json_filename = os.path.splitext(filename)[0] + ".json"
+    tmp_filename = json_filename + ".tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_filename, json_filename)
+    
+    print(f"Daily briefing saved to {filename} and {json_filename}")
+    return artifact
 
 class DailyBriefingCrew:
-    def __init__(self):
-        pass
+    def __init__(self, mode=None):
+        self.mode = mode or BRIEFING_MODE
+        if self.mode not in BRIEFING_MODES:
+            raise ValueError(f"Unknown briefing mode '{self.mode}', expected one of {BRIEFING_MODES}")
 
     def run_daily_workflow(self):
-        print("Starting Daily Briefing Generation...")
+        print(f"Starting Daily Briefing Generation ({self.mode} mode)...")
+        direct = self.mode == "direct"
+        started = time.perf_counter()
+        timings = {}
         
-        print("Fetching calendar events...")
-        events = get_todays_calendar_events()  # Use your working function instead
-        
-        print("Fetching priority tasks...")
-        priority_tasks = tasks.get_priority_tasks()
+        sections = {
+            "events": get_todays_calendar_events,  # Use your working function instead
+            "tasks": tasks.get_priority_tasks_direct if direct else tasks.get_priority_tasks,
+            "news_weather": tasks.get_news_and_weather_direct if direct else tasks.get_news_and_weather,
+        }
         
-        print("Fetching news and weather...")
-        news_weather = tasks.get_news_and_weather()
+        with get_openai_callback() as usage:
+            # The three fetches are independent; only suggestions needs all of them
+            print("Fetching calendar events, priority tasks, news and weather...")
+            with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+                # Each worker gets its own copy of the context so the token callback sees its LLM calls
+                futures = {
+                    name: executor.submit(contextvars.copy_context().run, self._timed, fetch)
+                    for name, fetch in sections.items()
+                }
+                results = {}
+                for name, future in futures.items():
+                    results[name], timings[name] = future.result()
+            events, priority_tasks, news_weather = results["events"], results["tasks"], results["news_weather"]
+            
+            print("💡 Generating suggestions...")
+            generate = tasks.generate_suggestions_direct if direct else tasks.generate_suggestions
+            suggestions, timings["suggestions"] = self._timed(generate, events, priority_tasks, news_weather)
         
-        print("💡 Generating suggestions...")
-        suggestions = tasks.generate_suggestions(events, priority_tasks, news_weather)
+        metrics = {
+            "mode": self.mode,
+            "wall_time_seconds": round(time.perf_counter() - started, 3),
+            "llm_requests": usage.successful_requests,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+            "section_seconds": timings
+        }
+        print(f"Briefing metrics: {metrics}")
         
         # Save to markdown file
-        save_briefing_to_md("daily_briefing.md", events, priority_tasks, news_weather, suggestions)
+        artifact = save_briefing_to_md(BRIEFING_FILE, events, priority_tasks, news_weather, suggestions)
         
         return {
             "events": events,
             "tasks": priority_tasks, 
             "news_weather": news_weather,
-            "suggestions": suggestions
+            "suggestions": suggestions,
+            "metrics": metrics,
+            **artifact
         }
+
+    def _timed(self, fetch, *args):
+        section_started = time.perf_counter()
+        result = fetch(*args)
+        return result, round(time.perf_counter() - section_started, 3)
@@ -179,66 +179,10 @@
 
 
 
-import os
-from pymongo import MongoClient
-from datetime import datetime
-import pytz
-from dotenv import load_dotenv
+from calendar_store import get_store, format_events
 
 def get_todays_calendar_events():
-    load_dotenv()
-    
-    client = MongoClient(os.getenv('MONGODB_URL'))
-    db = client['OrbitAI']
-    collection = db['OrbitAI']
-    
-    unique_events = set()
-    all_events = []
-    
-    for record in collection.find():
-        for key in record.keys():
-            if key.startswith('calendar:') or key.startswith('id:') and 'name:' in key and 'start:' in key:
-                # Split by 'id:' to get multiple events from one field
-                event_blocks = key.split('id:')[1:]  # Skip first empty part
-                
-                for block in event_blocks:
-                    if not block.strip():
-                        continue
-                        
-                    # Parse this event block
-                    lines = block.strip().split('\n')
-                    event_data = {}
-                    
-                    # First line is the event ID
-                    if lines:
-                        event_data['id'] = lines[0].strip()
-                    
-                    # Parse remaining lines
-                    for line in lines[1:]:
-                        if ':' in line:
-                            k, v = line.split(':', 1)
-                            event_data[k.strip()] = v.strip()
-                    
-                    # Check if valid event and not duplicate
-                    if 'name' in event_data and 'start' in event_data and 'id' in event_data:
-                        event_id = event_data['id']
-                        if event_id not in unique_events:
-                            unique_events.add(event_id)
-                            all_events.append(event_data)
-    
-    # Filter for today and format
-    ist = pytz.timezone('Asia/Kolkata')
-    today = datetime.now(ist).date()
-    
-    todays_events = []
-    for event in all_events:
-        start_str = event.get('start')
-        if today.strftime('%Y-%m-%d') in start_str:  # Check for today
-            try:
-                dt = datetime.fromisoformat(start_str.replace('+05:30', ''))
-                time_str = dt.strftime('%I:%M %p')
-                todays_events.append(f"• {event.get('name')} at {time_str}")
-            except:
-                todays_events.append(f"• {event.get('name')}")
-    
-    return '\n'.join(todays_events) if todays_events else "No calendar events found for today."
+    # Pick up any newly ingested raw records, then run an indexed range query for today
+    store = get_store()
+    store.sync()
+    return format_events(store.todays_events())
@@ -1,17 +1,21 @@
 import os
+import argparse
 from dotenv import load_dotenv
-from crew import DailyBriefingCrew
+from crew import DailyBriefingCrew, BRIEFING_MODES
 
 load_dotenv()
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Generate the daily briefing")
+    arg_parser.add_argument("--mode", choices=BRIEFING_MODES, help="Overrides BRIEFING_MODE")
+    args = arg_parser.parse_args()
+    
     print("=" * 50)
     print("DAILY BRIEFING GENERATOR")
     print("=" * 50)
     
-    crew = DailyBriefingCrew()
-    
     try:
+        crew = DailyBriefingCrew(mode=args.mode)
         briefing = crew.run_daily_workflow()
         
         print("\n" + "=" * 50)
@@ -26,6 +30,7 @@ def main():
         print(" Tasks:", briefing["tasks"][:100] + "...")
         print(" News:", briefing["news_weather"][:100] + "...")
         print(" Suggestions:", briefing["suggestions"][:100] + "...")
+        print(" Metrics:", briefing["metrics"])
         
     except Exception as e:
         print(f" Error: {e}")
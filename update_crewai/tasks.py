@@ -1,4 +1,5 @@
 from agents import CalendarAgent, TaskAgent, NewsWeatherAgent, SuggestionsAgent
+from tools import FetchNotionTasksTool, FetchNewsAndWeatherTool, GenerateSuggestionsTool
 
 def get_calendar_events():
     agent = CalendarAgent()
@@ -15,3 +16,15 @@ def get_news_and_weather():
 def generate_suggestions(events, tasks, news_weather):
     agent = SuggestionsAgent()
     return agent.generate_suggestions(events, tasks, news_weather)
+
+# Direct mode: call the deterministic tools without an agent deciding to do so,
+# leaving the suggestions prompt as the only LLM call
+
+def get_priority_tasks_direct():
+    return FetchNotionTasksTool()._run()
+
+def get_news_and_weather_direct():
+    return FetchNewsAndWeatherTool()._run()
+
+def generate_suggestions_direct(events, tasks, news_weather):
+    return GenerateSuggestionsTool()._run(f"Events: {events}, Tasks: {tasks}, News/Weather: {news_weather}")
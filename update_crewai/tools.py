@@ -1,19 +1,23 @@
 import os
+import sys
 import requests
 import json
-from datetime import datetime, timedelta
+from pathlib import Path
+from datetime import timedelta
 from dotenv import load_dotenv
-from pymongo import MongoClient
 from langchain.tools import BaseTool
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage
 from dateutil import parser
-import pytz
+from calendar_store import get_store, format_events
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agentic_rag.feed_cache import get_feed_cache
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-MONGODB_URL = os.getenv("MONGODB_URL")
 NOTION_API_TOKEN = os.getenv("NOTION_API_TOKEN")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
@@ -25,65 +29,9 @@ class FetchCalendarEventsTool(BaseTool):
 
     def _run(self, _input: str = None) -> str:
         try:
-            client = MongoClient(MONGODB_URL)
-            db = client["OrbitAI"]
-            collection = db["OrbitAI"]
-
-            # Get today's date in IST
-            ist = pytz.timezone('Asia/Kolkata')
-            today = datetime.now(ist).date()
-
-            unique_events = set()
-            all_events = []
-
-            for record in collection.find():
-                for key in record.keys():
-                    # Use the EXACT same logic that works in your debug script
-                    if key.startswith('calendar:') or key.startswith('id:') and 'name:' in key and 'start:' in key:
-                        # Split by 'id:' to get multiple events from one field
-                        event_blocks = key.split('id:')[1:]  # Skip first empty part
-                        
-                        for block in event_blocks:
-                            if not block.strip():
-                                continue
-                                
-                            # Parse this event block
-                            lines = block.strip().split('\n')
-                            event_data = {}
-                            
-                            # First line is the event ID
-                            if lines:
-                                event_data['id'] = lines[0].strip()
-                            
-                            # Parse remaining lines
-                            for line in lines[1:]:
-                                if ':' in line:
-                                    k, v = line.split(':', 1)
-                                    event_data[k.strip()] = v.strip()
-                            
-                            # Check if valid event and not duplicate
-                            if 'name' in event_data and 'start' in event_data and 'id' in event_data:
-                                event_id = event_data['id']
-                                if event_id not in unique_events:
-                                    unique_events.add(event_id)
-                                    all_events.append(event_data)
-
-            # Filter for today's events
-            todays_events = []
-            for event in all_events:
-                start_str = event.get('start')
-                if today.strftime("%Y-%m-%d") in start_str:  # Check for today's date
-                    try:
-                        dt = datetime.fromisoformat(start_str.replace('+05:30', ''))
-                        time_str = dt.strftime('%I:%M %p')
-                        todays_events.append(f"• {event.get('name')} at {time_str}")
-                    except:
-                        todays_events.append(f"• {event.get('name')}")
-
-            if not todays_events:
-                return "No calendar events found for today."
-
-            return "\n".join(todays_events)
+            store = get_store()
+            store.sync()
+            return format_events(store.todays_events())
 
         except Exception as e:
             return f"Error fetching calendar events: {str(e)}"
@@ -141,15 +89,10 @@ class FetchNewsAndWeatherTool(BaseTool):
 
     def _run(self, _input: str = None) -> str:
         try:
-            # Fetch news
-            news_url = "https://saurav.tech/NewsAPI/top-headlines/category/general/in.json"
-            news_response = requests.get(news_url)
-            news_data = news_response.json()
-            
-            # Fetch weather
-            weather_url = "https://api.open-meteo.com/v1/forecast?latitude=12.9165&longitude=79.1325&current=temperature_2m,wind_speed_10m,relative_humidity_2m&hourly=temperature_2m,precipitation"
-            weather_response = requests.get(weather_url)
-            weather_data = weather_response.json()
+            # Both feeds come from the cache shared with the RAG pipeline
+            feeds = get_feed_cache()
+            news_data = feeds.get("news")
+            weather_data = feeds.get("weather")
             
             # Format news
             news_items = []
@@ -1,17 +1,21 @@
-from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 import uuid
-from datetime import datetime, timedelta
+import json
+import hashlib
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
 import sys
 import asyncio
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import re
 import smtplib
 from email.mime.multipart import MIMEMultipart
@@ -19,14 +23,65 @@ from email.mime.base import MIMEBase
 from email import encoders
 from email.mime.text import MIMEText
 
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-
-from agentic_rag import rag_chat
-
 ROOT_DIR = Path(__file__).parent
+# Before the project imports below, some of which read their settings at import time
 load_dotenv(ROOT_DIR / '.env')
 
-app = FastAPI()
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "update_crewai"))
+
+from agentic_rag import RAGService, set_service
+# Only the artifact paths: the crew stack is imported when a briefing is generated,
+# so a broken briefing setup fails /daily_briefing rather than the whole server
+from briefing import agenerate_briefing, BRIEFING_FILE, BRIEFING_JSON_FILE
+
+# Each refresh only syncs Mongo records past the watermark, so it can run often
+RAG_INGEST_INTERVAL_SECONDS = int(os.environ.get('RAG_INGEST_INTERVAL_SECONDS', '60'))
+# Upper bound on threads used for the sync parts of the pipeline (vector search, feeds, SQLite)
+BLOCKING_EXECUTOR_WORKERS = int(os.environ.get('BLOCKING_EXECUTOR_WORKERS', '8'))
+BRIEFING_TIMEOUT_SECONDS = float(os.environ.get('BRIEFING_TIMEOUT_SECONDS', '300'))
+BRIEFING_TIMEZONE = ZoneInfo(os.environ.get('BRIEFING_TIMEZONE', 'Asia/Kolkata'))
+# Local time (HH:MM, in BRIEFING_TIMEZONE) at which the next day's briefing is precomputed
+BRIEFING_TIME = os.environ.get('BRIEFING_TIME', '06:00')
+# Clients may keep the briefing but must revalidate it with If-None-Match
+BRIEFING_CACHE_CONTROL = os.environ.get('BRIEFING_CACHE_CONTROL', 'private, no-cache')
+# When true, a new day serves the last good briefing (marked stale) and regenerates in the background
+BRIEFING_SERVE_STALE = os.environ.get('BRIEFING_SERVE_STALE', 'true').lower() in ('1', 'true', 'yes')
+
+# Dedicated thread for briefing generation so it never takes a slot from /chat
+briefing_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="orbitai-briefing")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the long-lived RAG service on startup and release its clients on shutdown"""
+    logger.info("Starting up OrbitAI backend...")
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_EXECUTOR_WORKERS, thread_name_prefix="orbitai-blocking")
+    )
+    service = await loop.run_in_executor(None, RAGService)
+    app.state.rag_service = service
+    set_service(service)
+    try:
+        await service.awarm_up()
+    except Exception as e:
+        logger.error(f"RAG warm-up failed: {str(e)}")
+
+    background = [
+        asyncio.create_task(briefing_scheduler.ensure_today()),
+        asyncio.create_task(briefing_scheduler.run_forever()),
+        asyncio.create_task(periodic_ingest(service)),
+    ]
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        set_service(None)
+        await service.aclose()
+        briefing_executor.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +89,8 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # The dashboard compares the briefing's ETag with /daily_briefing/status to know when to refetch
+    expose_headers=["ETag"],
 )
 
 logging.basicConfig(
@@ -42,11 +99,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("startup")
-async def startup_event():
-    """Check for daily briefing on startup"""
-    logger.info("Starting up OrbitAI backend...")
-    asyncio.create_task(check_and_generate_briefing())
+async def periodic_ingest(service):
+    """Keep the persistent RAG index fresh so /chat only has to embed the query"""
+    while True:
+        try:
+            stats = await service.aingest()
+            logger.info(f"RAG index refreshed: {stats}")
+        except Exception as e:
+            logger.error(f"Error refreshing RAG index: {str(e)}")
+        await asyncio.sleep(RAG_INGEST_INTERVAL_SECONDS)
 
 class StatusCheck(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -67,42 +128,105 @@ class DailyBriefingResponse(BaseModel):
     content: str
     last_generated: str
     sections: Dict[str, List[str]]
+    stale: bool = False
+    refreshing: bool = False
 
-last_briefing_date = None
+class DailyBriefingStatus(BaseModel):
+    etag: str = None
+    last_generated: str = None
+    stale: bool
+    refreshing: bool
 
 async def generate_daily_briefing():
-    global last_briefing_date
+    """Generate the briefing in-process; the result lands in BRIEFING_FILE/BRIEFING_JSON_FILE"""
     try:
         logger.info("Starting daily briefing generation...")
         
-        crewai_dir = Path(__file__).parent.parent.parent / "update_crewai"
-        run_script = crewai_dir / "run.py"
-        
-        if not run_script.exists():
-            logger.error(f"run.py not found at {run_script}")
-            return
-        
-        result = subprocess.run([
-            sys.executable, str(run_script)
-        ], cwd=str(crewai_dir), capture_output=True, text=True, timeout=300)
+        briefing = await asyncio.wait_for(
+            agenerate_briefing(executor=briefing_executor),
+            timeout=BRIEFING_TIMEOUT_SECONDS
+        )
         
-        if result.returncode == 0:
-            logger.info("Daily briefing generated successfully")
-            last_briefing_date = datetime.now().date()
-        else:
-            logger.error(f"Failed to generate daily briefing: {result.stderr}")
+        logger.info(f"Daily briefing generated successfully: {briefing['metrics']}")
+        return briefing
             
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         logger.error("Daily briefing generation timed out")
     except Exception as e:
         logger.error(f"Error generating daily briefing: {str(e)}")
 
-async def check_and_generate_briefing():
-    global last_briefing_date
-    today = datetime.now().date()
-    
-    if last_briefing_date != today:
-        await generate_daily_briefing()
+class BriefingScheduler:
+    """Runs at most one briefing generation at a time and precomputes it daily.
+
+    Callers that arrive while a generation is in flight await that same job
+    instead of starting another one. The date of the last briefing is read
+    from the saved artifact, so a restart doesn't regenerate today's.
+    """
+
+    def __init__(self, run_at: str, tz: ZoneInfo, artifact_path: Path = None):
+        hour, minute = (int(part) for part in run_at.split(':'))
+        self.run_at = dt_time(hour=hour, minute=minute)
+        self.tz = tz
+        self.last_briefing_date = self._artifact_date(artifact_path) if artifact_path else None
+        self._in_flight = None
+
+    def _artifact_date(self, path: Path):
+        """Day (in self.tz) of the artifact's generated_at, or None if there is no readable artifact"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                generated_at = json.load(f)["generated_at"]
+            # Written by crew.py as naive local time
+            return datetime.strptime(generated_at, "%Y-%m-%d %H:%M:%S").astimezone(self.tz).date()
+        except (FileNotFoundError, KeyError, ValueError) as e:
+            logger.info(f"No previous briefing date to resume from: {str(e)}")
+            return None
+
+    def today(self):
+        return datetime.now(self.tz).date()
+
+    @property
+    def refreshing(self):
+        return self._in_flight is not None and not self._in_flight.done()
+
+    def is_current(self):
+        return self.last_briefing_date == self.today()
+
+    def start(self):
+        """Start a generation in the background unless one is already running"""
+        if not self.refreshing:
+            self._in_flight = asyncio.create_task(self._generate())
+        return self._in_flight
+
+    async def generate(self):
+        """Start a generation, or join the one already running"""
+        # Shielded so a cancelled request doesn't cancel the shared job
+        return await asyncio.shield(self.start())
+
+    async def ensure_today(self):
+        """Generate only if today's briefing doesn't exist yet"""
+        if not self.is_current():
+            return await self.generate()
+
+    async def _generate(self):
+        briefing = await generate_daily_briefing()
+        if briefing is not None:
+            self.last_briefing_date = self.today()
+        return briefing
+
+    def seconds_until_next_run(self):
+        now = datetime.now(self.tz)
+        next_run = datetime.combine(now.date(), self.run_at, tzinfo=self.tz)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    async def run_forever(self):
+        while True:
+            await asyncio.sleep(self.seconds_until_next_run())
+            logger.info("Precomputing scheduled daily briefing...")
+            await self.generate()
+
+briefing_scheduler = BriefingScheduler(BRIEFING_TIME, BRIEFING_TIMEZONE, Path(BRIEFING_JSON_FILE))
 
 def parse_markdown_briefing(content: str) -> Dict[str, List[str]]:
     sections = {
@@ -152,6 +276,66 @@ def parse_markdown_briefing(content: str) -> Dict[str, List[str]]:
 
     return sections
 
+class BriefingCache:
+    """Parsed briefing kept in memory, keyed by the version of the file it came from.
+
+    Each request only stats the artifact; the file is read and parsed again
+    only after it changes. The JSON artifact is preferred, the markdown file
+    is parsed only when no JSON exists (briefings written before it did).
+    """
+
+    def __init__(self, json_path: Path, md_path: Path):
+        self.json_path = json_path
+        self.md_path = md_path
+        self._version = None
+        self._entry = None
+
+    def _current_version(self):
+        for path in (self.json_path, self.md_path):
+            try:
+                stat = path.stat()
+                return (str(path), stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                continue
+        return None
+
+    def get(self):
+        """Return {content, last_generated, sections, etag} or None when nothing exists on disk"""
+        version = self._current_version()
+        if version is None:
+            return None
+        if version != self._version:
+            self._entry = self._load(Path(version[0]))
+            self._version = version
+        return self._entry
+
+    def _load(self, path: Path):
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = f.read()
+        if path == self.json_path:
+            artifact = json.loads(raw)
+            content, last_generated, sections = artifact["content"], artifact["generated_at"], artifact["sections"]
+        else:
+            content = raw
+            sections = parse_markdown_briefing(content)
+            last_generated = datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+        return {
+            "content": content,
+            "last_generated": last_generated,
+            "sections": sections,
+            "etag": '"' + hashlib.sha1(raw.encode('utf-8')).hexdigest() + '"'
+        }
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag in candidates
+
+briefing_cache = BriefingCache(Path(BRIEFING_JSON_FILE), Path(BRIEFING_FILE))
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to OrbitAI Backend!"}
@@ -160,7 +344,7 @@ async def root():
 async def chat_endpoint(message: ChatMessage):
     try:
         logger.info(f"Received chat query: {message.query}")
-        response = rag_chat(message.query)
+        response = await app.state.rag_service.achat(message.query)
         
         if response == "error":
             logger.error("RAG system returned error")
@@ -179,40 +363,107 @@ async def chat_endpoint(message: ChatMessage):
             error=str(e)
         )
 
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(message: ChatMessage):
+    """Server-Sent Events: a 'sources' event, then one 'token' event per chunk, then 'done'"""
+    logger.info(f"Received streaming chat query: {message.query}")
+
+    async def events():
+        try:
+            async for event, data in app.state.rag_service.astream_chat(message.query):
+                yield sse_event(event, data)
+            yield sse_event("done", {})
+        except Exception as e:
+            logger.error(f"Error in streaming chat endpoint: {str(e)}")
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/chat/cache_stats")
+async def chat_cache_stats():
+    """Hit-rate metrics of the semantic answer cache in front of /chat"""
+    return app.state.rag_service.answer_cache.stats()
+
+@app.post("/ingest")
+async def ingest_endpoint():
+    try:
+        stats = await app.state.rag_service.aingest()
+        return {"message": "Index refreshed", "stats": stats}
+    except Exception as e:
+        logger.error(f"Error refreshing RAG index: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error refreshing index: {str(e)}")
+
+def briefing_etag(briefing, stale: bool, refreshing: bool) -> str:
+    """ETag of the response body, which also depends on the stale/refreshing flags"""
+    if not stale:
+        return briefing["etag"]
+    return briefing["etag"][:-1] + ('-stale-refreshing"' if refreshing else '-stale"')
+
 @app.get("/daily_briefing")
-async def get_daily_briefing(background_tasks: BackgroundTasks):
+async def get_daily_briefing(request: Request):
     try:
-        await check_and_generate_briefing()
+        briefing = briefing_cache.get()
         
-        briefing_file = Path(__file__).parent.parent.parent / "update_crewai" / "daily_briefing.md"
+        if briefing is not None and BRIEFING_SERVE_STALE and not briefing_scheduler.is_current():
+            # Answer right away with the last good briefing; the new one is built in the background
+            briefing_scheduler.start()
+        else:
+            await briefing_scheduler.ensure_today()
+            briefing = briefing_cache.get()
         
-        if not briefing_file.exists():
+        if briefing is None:
             logger.info("Daily briefing file not found, generating...")
-            print("Daily briefing file not found, generating...")
-            await generate_daily_briefing()
+            await briefing_scheduler.generate()
+            briefing = briefing_cache.get()
             
-            if not briefing_file.exists():
-                print("Failed to generate daily briefing file.")
+            if briefing is None:
+                logger.error("Failed to generate daily briefing file.")
                 raise HTTPException(status_code=404, detail="Daily briefing could not be generated")
         
-        with open(briefing_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        sections = parse_markdown_briefing(content)
-        print("Parsed sections:", sections)
-        mod_time = datetime.fromtimestamp(briefing_file.stat().st_mtime)
-        last_generated = mod_time.strftime("%Y-%m-%d %H:%M:%S")
+        stale = not briefing_scheduler.is_current()
+        refreshing = briefing_scheduler.refreshing
+        etag = briefing_etag(briefing, stale, refreshing)
+        headers = {"ETag": etag, "Cache-Control": BRIEFING_CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
         
-        return DailyBriefingResponse(
-            content=content,
-            last_generated=last_generated,
-            sections=sections
+        body = DailyBriefingResponse(
+            content=briefing["content"],
+            last_generated=briefing["last_generated"],
+            sections=briefing["sections"],
+            stale=stale,
+            refreshing=refreshing
         )
+        return JSONResponse(content=body.model_dump(), headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in daily briefing endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving daily briefing: {str(e)}")
 
+@app.get("/daily_briefing/status", response_model=DailyBriefingStatus)
+async def get_daily_briefing_status():
+    """Cheap poll target: the client refetches /daily_briefing once the etag changes"""
+    briefing = briefing_cache.get()
+    stale = not briefing_scheduler.is_current()
+    refreshing = briefing_scheduler.refreshing
+    if briefing is None:
+        return DailyBriefingStatus(stale=stale, refreshing=refreshing)
+    return DailyBriefingStatus(
+        etag=briefing_etag(briefing, stale, refreshing),
+        last_generated=briefing["last_generated"],
+        stale=stale,
+        refreshing=refreshing
+    )
+
 @app.post("/notes_send_mail")  # Changed from GET to POST
 async def send_mail(request: dict):
     try:
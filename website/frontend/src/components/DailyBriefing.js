@@ -10,12 +10,16 @@ const api = axios.create({
   baseURL: API_BASE_URL,
 });
 
+// How often /daily_briefing/status is polled while a stale briefing is being regenerated
+const BRIEFING_POLL_INTERVAL_MS = 5000;
+
 const DailyBriefing = ({ onClose }) => {
   const contentRef = useRef(null);
   const scrollRef = useRef(null);
   const [briefingData, setBriefingData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const etagRef = useRef(null);
 
   // Auto-scroll to top when modal opens and fetch briefing data
   useEffect(() => {
@@ -25,18 +29,45 @@ const DailyBriefing = ({ onClose }) => {
     fetchBriefingData();
   }, []);
 
-  const fetchBriefingData = async () => {
+  // The server answers a new day with the last briefing (stale) while it builds today's;
+  // poll its status and swap the new briefing in once the ETag changes
+  const isRefreshing = Boolean(briefingData?.stale && briefingData?.refreshing);
+  useEffect(() => {
+    if (!isRefreshing) return undefined;
+
+    const interval = setInterval(async () => {
+      try {
+        const { data: status } = await api.get('/daily_briefing/status');
+        if (status.etag && status.etag !== etagRef.current) {
+          fetchBriefingData({ silent: true });
+        }
+      } catch (error) {
+        console.error('Error polling daily briefing status:', error);
+      }
+    }, BRIEFING_POLL_INTERVAL_MS);
+    return () => clearInterval(interval);
+  }, [isRefreshing]);
+
+  const fetchBriefingData = async ({ silent = false } = {}) => {
     try {
-      setLoading(true);
-      setError(null);
+      if (!silent) {
+        setLoading(true);
+        setError(null);
+      }
       
       console.log('Fetching daily briefing...');
       const response = await api.get('/daily_briefing');
       
       console.log('Briefing data received:', response.data);
+      etagRef.current = response.headers.etag || null;
       setBriefingData(response.data);
       
     } catch (error) {
+      if (silent) {
+        // Keep showing the briefing we have; the next poll tries again
+        console.error('Error refreshing daily briefing:', error);
+        return;
+      }
       console.error('Error fetching daily briefing:', error);
       
       let errorMessage = 'Failed to load daily briefing.';
@@ -221,6 +252,15 @@ const DailyBriefing = ({ onClose }) => {
           <div>
             <h2 className="text-xl font-semibold text-foreground">Daily Briefing</h2>
             <p className="text-sm text-muted-foreground mt-1">Your personalized overview for today</p>
+            {briefingData?.stale && (
+              <p className="flex items-center space-x-1 text-xs text-amber-500 mt-1">
+                {briefingData.refreshing && <Loader2 className="h-3 w-3 animate-spin" />}
+                <span>
+                  {`From ${briefingData.last_generated}`}
+                  {briefingData.refreshing ? ' - updating to today\'s briefing...' : ' - today\'s briefing is not available yet'}
+                </span>
+              </p>
+            )}
           </div>
           <div className="flex items-center space-x-2">
             {/* Export buttons */}
@@ -272,7 +312,7 @@ const DailyBriefing = ({ onClose }) => {
                 <p className="text-foreground font-medium mb-2">Failed to load briefing</p>
                 <p className="text-xs text-muted-foreground mb-4">{error}</p>
                 <button
-                  onClick={fetchBriefingData}
+                  onClick={() => fetchBriefingData()}
                   className="bg-foreground text-background hover:bg-foreground/90 font-medium py-2 px-4 rounded-lg transition-all duration-200"
                 >
                   Try Again
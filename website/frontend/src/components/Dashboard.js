@@ -25,6 +25,45 @@ const api = axios.create({
   baseURL: API_BASE_URL
 });
 
+// Reads the /chat/stream Server-Sent Events and hands each token to onToken
+const streamChat = async (query, onToken) => {
+  const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ query })
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Server error (${response.status})`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach((line) => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      });
+      const payload = data ? JSON.parse(data) : null;
+
+      if (event === 'token') onToken(payload);
+      else if (event === 'error') throw new Error(payload?.error || 'Streaming error');
+    }
+  }
+};
+
 const Dashboard = ({ setIsAuthenticated }) => {
   const [showBriefing, setShowBriefing] = useState(false);
   const [query, setQuery] = useState('');
@@ -126,6 +165,28 @@ const Dashboard = ({ setIsAuthenticated }) => {
 
     try {
       console.log('Sending query to backend:', currentQuery);
+
+      // Stream tokens into the bot message as they arrive; fall back to /chat if nothing streamed
+      let streamedText = '';
+      try {
+        await streamChat(currentQuery, (token) => {
+          if (!streamedText) {
+            setIsThinking(false);
+            setChatMessages(prev => [...prev, { type: 'bot', text: '', timestamp: new Date(), error: null }]);
+          }
+          streamedText += token;
+          const text = streamedText;
+          setChatMessages(prev => {
+            const next = [...prev];
+            next[next.length - 1] = { ...next[next.length - 1], text };
+            return next;
+          });
+        });
+        if (streamedText) return;
+      } catch (streamError) {
+        if (streamedText) throw streamError;
+        console.warn('Streaming chat failed, falling back to /chat:', streamError);
+      }
       
       const response = await api.post('/chat', {
         query: currentQuery
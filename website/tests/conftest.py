@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The tests import agentic_rag from the repository root, which pytest only puts on
+# sys.path when run as "python -m pytest" from there (server.py does the same insert)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
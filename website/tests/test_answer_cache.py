@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from agentic_rag.answer_cache import SemanticAnswerCache
+from agentic_rag.query_filters import QUERY_TIMEZONE, parse_query_filters, filters_key
+
+NOW = datetime(2024, 5, 15, 9, 30, tzinfo=QUERY_TIMEZONE)
+
+def key_for(query):
+    return filters_key(parse_query_filters(query, now=NOW))
+
+def test_today_and_tomorrow_do_not_share_an_answer():
+    cache = SemanticAnswerCache(threshold=0.95)
+    # Near-identical embeddings, as "meetings today" and "meetings tomorrow" get
+    cache.put([1.0, 0.0, 0.01], "v1", "Standup at 10am", key=key_for("What meetings do I have today?"))
+
+    assert cache.get([1.0, 0.0, 0.0], "v1", key_for("What meetings do I have tomorrow?")) is None
+    hit = cache.get([1.0, 0.0, 0.0], "v1", key_for("what meetings do i have today"))
+    assert hit["answer"] == "Standup at 10am"
+
+def test_same_filters_on_another_day_resolve_to_a_different_key():
+    monday = datetime(2024, 5, 13, 9, 0, tzinfo=QUERY_TIMEZONE)
+    assert filters_key(parse_query_filters("meetings today", now=monday)) != key_for("meetings today")
+
+def test_version_change_drops_entries():
+    cache = SemanticAnswerCache()
+    cache.put([0.0, 1.0], "v1", "answer")
+    assert cache.get([0.0, 1.0], "v2") is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+from agentic_rag.query_filters import QUERY_TIMEZONE, parse_query_filters, candidate_filters, date_key
+
+# A Wednesday
+NOW = datetime(2024, 5, 15, 9, 30, tzinfo=QUERY_TIMEZONE)
+
+def parse(query):
+    return parse_query_filters(query, now=NOW)
+
+def test_today_implies_calendar():
+    filters = parse("What do I have today?")
+    assert filters == {"types": ["calendar"], "date_from": date(2024, 5, 15), "date_to": date(2024, 5, 15), "hour": None}
+
+def test_tomorrow_and_yesterday():
+    assert parse("meetings tomorrow")["date_from"] == date(2024, 5, 16)
+    assert parse("meetings yesterday")["date_to"] == date(2024, 5, 14)
+
+def test_weekday_is_the_next_occurrence():
+    assert parse("any meetings on friday")["date_from"] == date(2024, 5, 17)
+    assert parse("any meetings on monday")["date_from"] == date(2024, 5, 20)
+    assert parse("any meetings on wednesday")["date_from"] == date(2024, 5, 15)
+
+def test_this_and_next_week_run_monday_to_sunday():
+    this_week = parse("my schedule this week")
+    assert (this_week["date_from"], this_week["date_to"]) == (date(2024, 5, 13), date(2024, 5, 19))
+    next_week = parse("my schedule next week")
+    assert (next_week["date_from"], next_week["date_to"]) == (date(2024, 5, 20), date(2024, 5, 26))
+
+def test_iso_date_wins_over_relative_words():
+    assert parse("meetings on 2024-06-01, not today")["date_from"] == date(2024, 6, 1)
+
+def test_hours():
+    assert parse("meeting at 3pm")["hour"] == 15
+    assert parse("meeting at 12am")["hour"] == 0
+    assert parse("meeting at 12 pm")["hour"] == 12
+    assert parse("meeting at 10:30 am")["hour"] == 10
+    assert parse("meeting at 13pm")["hour"] is None
+
+def test_types_without_dates():
+    assert parse("latest news and weather")["types"] == ["weather", "news"]
+    assert parse("tell me a joke") == {"types": [], "date_from": None, "date_to": None, "hour": None}
+
+def test_candidate_filters_go_from_strictest_to_none():
+    day = date_key(date(2024, 5, 16))
+    assert candidate_filters(parse("meetings tomorrow at 3pm")) == [
+        {"$and": [
+            {"type": "calendar"},
+            {"date_key": {"$gte": day}},
+            {"date_key": {"$lte": day}},
+            {"start_hour": 15},
+        ]},
+        {"$and": [{"type": "calendar"}, {"date_key": {"$gte": day}}, {"date_key": {"$lte": day}}]},
+        {"type": "calendar"},
+        None,
+    ]
+
+def test_candidate_filters_drop_duplicates():
+    assert candidate_filters(parse("any emails?")) == [{"type": "email"}, None]
+    assert candidate_filters(parse("news or weather")) == [{"type": {"$in": ["weather", "news"]}}, None]
+    assert candidate_filters(parse("hello")) == [None]